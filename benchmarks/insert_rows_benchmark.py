@@ -0,0 +1,110 @@
+"""
+Сравнение скорости записи строк: построчная запись insert_row (путь записи до insert_rows), executemany
+параметризованного INSERT без fast_executemany (Access) и COPY (Postgres), пакетная запись insert_rows.
+Строки пишутся во временную таблицу, которая удаляется после замера.
+Запуск из корня репозитория:
+    python -m benchmarks.insert_rows_benchmark [--rows 20000]                      (временный файл SQLite)
+    python -m benchmarks.insert_rows_benchmark --mdb D:\\base.mdb
+    python -m benchmarks.insert_rows_benchmark --postgres kursk_un_1 --server SR-RET-CAD
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+
+from tools.utils.sql_utils import BaseType, Connection
+
+TABLE_NAME: str = 'benchmark_insert_rows'
+COLUMNS: list[str] = ['KKS', 'PART', 'MODULE', 'KKSp', 'NAME_RUS', 'NAME_ENG', 'CABINET', 'CHANNEL', 'UNITS_RUS',
+                      'SCHEMA']
+
+
+def generate_rows(row_count: int) -> list[list[str]]:
+    return [[f'10BBA{index % 100:02d}GS{index:06d}', f'XB{index % 30:02d}', '1691', f'10CWA{index % 50:02d}',
+             f'Сигнал {index} вкл', f'Signal {index} on', f'C{index % 8}', str(index % 32), 'мм', 'BI_1623']
+            for index in range(row_count)]
+
+
+def write_with_insert_row(connection: Connection, rows: list[list[str]]) -> None:
+    for row in rows:
+        connection.insert_row(table_name=TABLE_NAME, column_names=COLUMNS, values=row)
+
+
+def write_with_executemany(connection: Connection, rows: list[list[str]]) -> None:
+    placeholder: str = '%s' if connection.get_base_type() == BaseType.POSTGRES else '?'
+    query: str = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(connection.modify_table_name(TABLE_NAME),
+                                                             ','.join(connection.modify_column_names(COLUMNS)),
+                                                             ','.join([placeholder] * len(COLUMNS)))
+    cursor = connection._cursor
+    if connection.get_base_type() == BaseType.ACCESS:
+        cursor.fast_executemany = False
+    for batch in Connection._split_to_batches(rows, Connection.INSERT_BATCH_SIZE):
+        cursor.executemany(query, batch)
+
+
+def write_with_insert_rows(connection: Connection, rows: list[list[str]]) -> None:
+    connection.insert_rows(table_name=TABLE_NAME, column_names=COLUMNS, rows=rows)
+
+
+def measure(connection: Connection, write: Callable[[Connection, list[list[str]]], None],
+            rows: list[list[str]]) -> float:
+    """
+    Время записи строк с фиксацией транзакции
+    :return: Время, с
+    """
+    connection.clear_table(table_name=TABLE_NAME)
+    connection.commit()
+    start_time: float = time.perf_counter()
+    write(connection, rows)
+    connection.commit()
+    elapsed_time: float = time.perf_counter() - start_time
+    if connection.get_row_count(TABLE_NAME) != len(rows):
+        raise Exception('Число записанных строк не совпадает')
+    return elapsed_time
+
+
+def get_connection(arguments: argparse.Namespace) -> Connection:
+    if arguments.mdb is not None:
+        return Connection.connect_to_mdb(arguments.mdb)
+    if arguments.postgres is not None:
+        return Connection.connect_to_postgres(database=arguments.postgres, user=arguments.user,
+                                              password=arguments.password, server=arguments.server,
+                                              port=arguments.port)
+    return Connection.connect_to_sqlite(arguments.sqlite)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Сравнение скорости записи строк')
+    parser.add_argument('--rows', type=int, default=20000, help='Число записываемых строк')
+    parser.add_argument('--sqlite', default=os.path.join(tempfile.gettempdir(), 'insert_rows_benchmark.sqlite'),
+                        help='Файл SQLite (по умолчанию - временный файл)')
+    parser.add_argument('--mdb', default=None, help='Файл базы Access')
+    parser.add_argument('--postgres', default=None, help='Имя базы Postgres')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='postgres')
+    parser.add_argument('--server', default='localhost')
+    parser.add_argument('--port', type=int, default=5432)
+    arguments = parser.parse_args()
+
+    rows: list[list[str]] = generate_rows(arguments.rows)
+    connection: Connection = get_connection(arguments)
+    with connection:
+        connection.create_table(table_name=TABLE_NAME, column_names=COLUMNS)
+        try:
+            results: list[tuple[str, float]] = [
+                ('insert_row', measure(connection, write_with_insert_row, rows)),
+                ('executemany', measure(connection, write_with_executemany, rows)),
+                ('insert_rows', measure(connection, write_with_insert_rows, rows))]
+        finally:
+            connection.rollback()
+            connection._execute(f'DROP TABLE {connection.modify_table_name(TABLE_NAME)}')
+            connection.commit()
+    print(f'База: {connection.get_base_type().name}, строк: {len(rows)}')
+    for name, elapsed_time in results:
+        print('{0:<12} {1:8.3f} с {2:10.0f} строк/с {3:6.1f}x'.format(name, elapsed_time, len(rows) / elapsed_time,
+                                                                     results[0][1] / elapsed_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Сравнение поиска шаблонов нетиповых сигналов: прежний перебор re.search по всем шаблонам для каждой строки
+таблицы АЭП и SignalModificationMatcher. База данных не нужна, строки таблицы АЭП генерируются.
+Запуск из корня репозитория: python -m benchmarks.signal_modification_benchmark [--rows 100000]
+"""
+import argparse
+import random
+import re
+import time
+from collections.abc import Callable
+
+from tools.generate_tables import SignalModification, SignalModificationMatcher
+from tools.options import Options
+
+
+def find_with_loop(signal_modifications: list[SignalModification], kks: str, part: str) -> SignalModification | None:
+    # Поиск в том виде, в котором он выполнялся в GenerateTables._modificate_signal до SignalModificationMatcher
+    return next((item for item in signal_modifications
+                 if re.search(item.signal_kks, kks) and re.search(item.signal_part, part)), None)
+
+
+def get_signal_modifications() -> list[SignalModification]:
+    """
+    Шаблоны проекта Руппур и дополнительные шаблоны разных видов (точное значение PART, постоянное начало KKS,
+    произвольное регулярное выражение)
+    :return: Список шаблонов
+    """
+    signal_modifications: list[SignalModification] = list(
+        Options.load_ruppur().generate_table_options.signal_modifications)
+    for index in range(10):
+        letter: str = 'ABCDEFGHJK'[index]
+        signal_modifications.append(SignalModification(signal_kks=f'^[12]0BB{letter}[0-9]{{2}}GS00[1-3]$',
+                                                       signal_part=f'^XB{index + 10}$',
+                                                       new_name_rus=f'Шаблон {index}'))
+    signal_modifications.append(SignalModification(signal_kks='GH00[1-5]', signal_part='^XA(01|02)$',
+                                                   new_template='SW_1623'))
+    signal_modifications.append(SignalModification(signal_kks='^10BFR', signal_part='XA1.',
+                                                   new_kks='10BFR07EK001'))
+    return signal_modifications
+
+
+def generate_signals(row_count: int, seed: int) -> list[tuple[str, str]]:
+    """
+    Синтетические пары (KKS, PART) строк таблицы АЭП
+    :param row_count: Число строк
+    :param seed: Начальное значение генератора случайных чисел
+    :return: Список пар
+    """
+    generator: random.Random = random.Random(seed)
+    parts: list[str] = [f'XB{index:02d}' for index in range(1, 30)] + \
+                       [f'XA{index:02d}' for index in range(1, 15)] + ['XF20', 'XL01', 'XL02']
+    signals: list[tuple[str, str]] = []
+    for _ in range(row_count):
+        kks: str = '{0}0{1}{2:02d}{3}{4:03d}'.format(generator.choice('12'),
+                                                    generator.choice(['BBA', 'BBB', 'BBC', 'BBG', 'BFR', 'BCE']),
+                                                    generator.randint(1, 30),
+                                                    generator.choice(['GS', 'GH', 'GU', 'EK']),
+                                                    generator.randint(1, 12))
+        signals.append((kks, generator.choice(parts)))
+    return signals
+
+
+def measure(find: Callable[[str, str], SignalModification | None], signals: list[tuple[str, str]],
+            repeat: int) -> tuple[float, list[SignalModification | None]]:
+    """
+    Лучшее время из нескольких проходов по всем строкам
+    :return: Время, с, и найденные шаблоны
+    """
+    best_time: float | None = None
+    results: list[SignalModification | None] = []
+    for _ in range(repeat):
+        start_time: float = time.perf_counter()
+        results = [find(kks, part) for kks, part in signals]
+        elapsed_time: float = time.perf_counter() - start_time
+        best_time = elapsed_time if best_time is None else min(best_time, elapsed_time)
+    return best_time, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Сравнение поиска шаблонов нетиповых сигналов')
+    parser.add_argument('--rows', type=int, default=100000, help='Число строк таблицы АЭП')
+    parser.add_argument('--repeat', type=int, default=3, help='Число проходов (учитывается лучшее время)')
+    parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора случайных чисел')
+    arguments = parser.parse_args()
+
+    signal_modifications: list[SignalModification] = get_signal_modifications()
+    signals: list[tuple[str, str]] = generate_signals(row_count=arguments.rows, seed=arguments.seed)
+    loop_time, loop_results = measure(
+        lambda kks, part: find_with_loop(signal_modifications, kks, part), signals, arguments.repeat)
+    matcher: SignalModificationMatcher = SignalModificationMatcher(signal_modifications)
+    matcher_time, matcher_results = measure(matcher.find, signals, arguments.repeat)
+    if any(loop_result is not matcher_result for loop_result, matcher_result in zip(loop_results, matcher_results)):
+        raise Exception('Результаты поиска шаблонов не совпадают')
+
+    matched: int = sum(result is not None for result in matcher_results)
+    print(f'Строк: {len(signals)}, шаблонов: {len(signal_modifications)}, найдено совпадений: {matched}')
+    for name, elapsed_time in (('Перебор re.search', loop_time), ('SignalModificationMatcher', matcher_time)):
+        print('{0:<26} {1:8.3f} с {2:12.0f} строк/с'.format(name, elapsed_time, len(signals) / elapsed_time))
+    print('Ускорение: {0:.1f}x'.format(loop_time / matcher_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,8 @@ from tools.options import Options
 from tools.utils.log_utils import configure_logger
 # noinspection PyUnresolvedReferences
 from tools.copy_cid import CopyCid
-from tools.utils.sql_utils import Connection
+# noinspection PyUnresolvedReferences
+from tools.utils.sql_utils import Connection, TransactionPolicy
 
 
 def run_scripts():
@@ -24,6 +25,18 @@ def run_scripts():
                                                             password='postgres',
                                                             server='SR-RET-CAD',
                                                             port=5432)
+    # Локальная копия базы (см. Connection.clone_to_sqlite)
+    # connection: Connection = Connection.connect_to_sqlite('kursk_un_1.sqlite')
+    # Snapshot для повторных запусков без сервера. Скрипты изменяют таблицы, поэтому каждый запуск выполняется на
+    # рабочей копии snapshot (Connection.open_snapshot открывает snapshot только для чтения)
+    # with connection:
+    #     connection.export_snapshot(snapshot_path='kursk_un_1.snapshot', table_names=options.get_snapshot_tables(),
+    #                                indexes=options.get_snapshot_indexes())
+    # connection: Connection = Connection.copy_snapshot(snapshot_path='kursk_un_1.snapshot',
+    #                                                   working_path='kursk_un_1_work.sqlite')
+    # Фиксация изменений после каждых 10000 записанных строк (TransactionPolicy.STAGE - одна фиксация на этап).
+    # По умолчанию изменения фиксируются сразу (TransactionPolicy.IMMEDIATE)
+    # connection.set_transaction_policy(TransactionPolicy.ROWS, commit_rows=10000)
 
     # Генерация таблиц из таблицы [Сигналы и механизмы АЭП]
     # Закомментировать если не используется
@@ -2,7 +2,7 @@ import logging
 from dataclasses import dataclass
 
 from tools.utils.progress_utils import ProgressBar
-from tools.utils.sql_utils import Connection
+from tools.utils.sql_utils import Connection, RowFormat, IndexDescription
 
 
 @dataclass(init=True, repr=False, eq=False, order=False, frozen=True)
@@ -498,10 +498,14 @@ class MMSGenerator:
 class FillMMSAdress:
     _options: FillMMSAddressOptions
     _connection: Connection
+    _ied_records: list[list[str | bool]]
+
+    IED_COLUMNS: list[str] = ['IED_NAME', 'DATASET', 'RB_MASTER', 'RB_SLAVE', 'KKSp', 'ICD_PATH', 'EMULATOR']
 
     def __init__(self, options: FillMMSAddressOptions, connection: Connection):
         self._options = options
         self._connection = connection
+        self._ied_records = []
 
     def _get_kksp_list(self) -> list[str]:
         """
@@ -520,7 +524,12 @@ class FillMMSAdress:
             kksp_list.append(value[self._connection.modify_column_name('KKSp')])
         return kksp_list
 
-    def _write_mms(self, kks: str, part: str, mms_address: str, ied_name: str):
+    @staticmethod
+    def _get_mms_row(kks: str, part: str, mms_address: str, ied_name: str) -> tuple[list[str], list[str]]:
+        """
+        Формирование строки для обновления MMS адреса сигнала
+        :return: Пара из значений ключевых полей (KKS, PART) и значений полей MMS, MMS_POS, MMS_COM, IED_NAME
+        """
         mms: str = ''
         mms_pos: str = ''
         mms_com: str = ''
@@ -530,11 +539,13 @@ class FillMMSAdress:
             mms_pos = mms_address
         else:
             mms = mms_address
-        self._connection.update_field(table_name=self._options.iec_table_name,
-                                      fields=['MMS', 'MMS_POS', 'MMS_COM', 'IED_NAME'],
-                                      values=[mms, mms_pos, mms_com, ied_name],
-                                      key_names=['KKS', 'PART'],
-                                      key_values=[kks, part])
+        return [kks, part], [mms, mms_pos, mms_com, ied_name]
+
+    def _write_mms(self, mms_rows: list[tuple[list[str], list[str]]]) -> None:
+        self._connection.update_fields_bulk(table_name=self._options.iec_table_name,
+                                            fields=['MMS', 'MMS_POS', 'MMS_COM', 'IED_NAME'],
+                                            key_names=['KKS', 'PART'],
+                                            rows=mms_rows)
 
     def _generate_mms_for_kksp(self, kksp: str):
         mms_generator: MMSGenerator = MMSGenerator(kksp=kksp,
@@ -557,15 +568,16 @@ class FillMMSAdress:
         mms_addresses += mms_generator.add_undubled_signals()
         mms_addresses += mms_generator.add_undubled_bsc_signals()
         ied_name: str = 'IED_' + kksp.replace('-', '_')
+        mms_rows: list[tuple[list[str], list[str]]] = []
         for kks, part, mms_address in mms_addresses:
-            self._write_mms(kks=kks,
-                            part=part,
-                            mms_address=mms_address,
-                            ied_name=ied_name)
+            mms_rows.append(self._get_mms_row(kks=kks,
+                                              part=part,
+                                              mms_address=mms_address,
+                                              ied_name=ied_name))
             ProgressBar.update_progress()
+        self._write_mms(mms_rows=mms_rows)
         if self._options.datasets is not None and len(mms_generator.dataset_container) > 0:
             self._add_emulator_ied_record(mms_generator=mms_generator)
-        self._connection.commit()
 
     def _add_emulator_ied_record(self, mms_generator: MMSGenerator) -> None:
         """
@@ -576,29 +588,30 @@ class FillMMSAdress:
         dataset_list: str = ';'.join([dataset.path for dataset in mms_generator.dataset_container])
         rb_master_list: str = ';'.join([dataset.rcb_main for dataset in mms_generator.dataset_container])
         rb_slave_list: str = ';'.join([dataset.rcb_res for dataset in mms_generator.dataset_container])
-        self._connection.insert_row(table_name=self._options.ied_table_name,
-                                    column_names=['IED_NAME', 'DATASET', 'RB_MASTER', 'RB_SLAVE', 'KKSp', 'ICD_PATH',
-                                                  'EMULATOR'],
-                                    values=[mms_generator.ied_name, dataset_list, rb_master_list, rb_slave_list,
-                                            mms_generator.kksp, mms_generator.filename, True])
+        self._ied_records.append([mms_generator.ied_name, dataset_list, rb_master_list, rb_slave_list,
+                                  mms_generator.kksp, mms_generator.filename, True])
 
     def _add_real_ied_record(self, kksp: str, ied_name: str, file_name: str, dataset_list: list[str],
                              rb_master_list: list[str], rb_slave_list: list[str]) -> None:
         dataset_list: str = ';'.join(dataset_list)
         rb_master_list: str = ';'.join(rb_master_list)
         rb_slave_list: str = ';'.join(rb_slave_list)
-        self._connection.insert_row(table_name=self._options.ied_table_name,
-                                    column_names=['IED_NAME', 'DATASET', 'RB_MASTER', 'RB_SLAVE', 'KKSp', 'ICD_PATH',
-                                                  'EMULATOR'],
-                                    values=[ied_name, dataset_list, rb_master_list, rb_slave_list,
-                                            kksp, file_name, False])
-
-    def _is_emulator(self, kksp: str) -> bool:
-        values: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.mms_table_name,
-                                                                      fields=['IED_NAME'],
-                                                                      key_names=['KKSp'],
-                                                                      key_values=[kksp],
-                                                                      uniq_values=True)
+        self._ied_records.append([ied_name, dataset_list, rb_master_list, rb_slave_list,
+                                  kksp, file_name, False])
+
+    def _get_ied_names(self, kksp_list: list[str]) -> dict[tuple[str], list[dict[str, str]]]:
+        """
+        Загрузка имен IED из таблицы MMS для всех KKSp одним запросом
+        :param kksp_list: Список KKSp
+        :return: Словарь, где ключ - кортеж из KKSp, значение - строки с именами IED
+        """
+        return self._connection.retrieve_data_many(table_name=self._options.mms_table_name,
+                                                   fields=['IED_NAME'],
+                                                   key_names=['KKSp'],
+                                                   key_values_list=[(kksp,) for kksp in kksp_list],
+                                                   uniq_values=True)
+
+    def _is_emulator(self, kksp: str, values: list[dict[str, str]]) -> bool:
         if len(values) == 0:
             return True
         if len(values) == 1:
@@ -617,10 +630,11 @@ class FillMMSAdress:
                                                           value[self._connection.modify_column_name('PART')]),
                                                          value[self._connection.modify_column_name('MMS_address')])
                                                         for value in mms_values])
-        signal_values: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.iec_table_name,
-                                                                             fields=['KKS', 'PART', 'FAKE'],
-                                                                             key_names=['KKSp'],
-                                                                             key_values=[kksp])
+        signal_values: list[tuple] = self._connection.retrieve_data(table_name=self._options.iec_table_name,
+                                                                    fields=['KKS', 'PART', 'FAKE'],
+                                                                    key_names=['KKSp'],
+                                                                    key_values=[kksp],
+                                                                    row_factory=RowFormat.TUPLE)
         dataset_list: list[str] = list({value[self._connection.modify_column_name('Dataset')]
                                         for value in mms_values if
                                         value[self._connection.modify_column_name('Dataset')] is not None
@@ -652,12 +666,11 @@ class FillMMSAdress:
                                   rb_master_list=report_master_list,
                                   rb_slave_list=report_slave_list)
 
-        for signal in signal_values:
+        mms_rows: list[tuple[list[str], list[str]]] = []
+        for kks, part, is_fake in signal_values:
             ProgressBar.update_progress()
-            kks: str = signal[self._connection.modify_column_name('KKS')]
-            part: str = signal[self._connection.modify_column_name('PART')]
-            is_fake: bool = True if signal[self._connection.modify_column_name('FAKE')] == 'True' else False
-            if is_fake:
+            # FAKE может быть логическим, числовым (0/1) или текстовым полем в зависимости от базы
+            if str(is_fake) in ('True', 'true', '1'):
                 continue
 
             mms: str | None = mms_storage.get((kks, part), None)
@@ -667,11 +680,11 @@ class FillMMSAdress:
                              f'{self._options.mms_table_name}')
                 if mms is None:
                     mms = ''
-            self._write_mms(kks=kks,
-                            part=part,
-                            mms_address=mms,
-                            ied_name=ied_name)
-        self._connection.commit()
+            mms_rows.append(self._get_mms_row(kks=kks,
+                                              part=part,
+                                              mms_address=mms,
+                                              ied_name=ied_name))
+        self._write_mms(mms_rows=mms_rows)
 
     def _fill_mms(self) -> None:
         """
@@ -679,26 +692,59 @@ class FillMMSAdress:
         :return: None
         """
         max_value: int = self._connection.get_row_count(self._options.iec_table_name)
-        logging.info('Очистка таблицы IED...')
-        self._connection.clear_table(table_name=self._options.ied_table_name)
-        logging.info('Завершено.')
         logging.info('Заполнение адресов MMS...')
         ProgressBar.config(max_value=max_value, step=1, prefix='Обработка MMS адресов', suffix='Завершено', length=50)
         kksp_list: list[str] = self._get_kksp_list()
+        ied_names: dict[tuple[str], list[dict[str, str]]] = self._get_ied_names(kksp_list=kksp_list)
         for kksp in kksp_list:
-            if self._is_emulator(kksp=kksp):
-                self._generate_mms_for_kksp(kksp=kksp)
-            else:
-                self._copy_mms_for_kksp(kksp=kksp)
+            try:
+                with self._connection.savepoint():
+                    if self._is_emulator(kksp=kksp, values=ied_names[(kksp,)]):
+                        self._generate_mms_for_kksp(kksp=kksp)
+                    else:
+                        self._copy_mms_for_kksp(kksp=kksp)
+            except Exception:
+                # Изменения KKSp отменены откатом к точке сохранения, таблица IED не изменяется
+                logging.error(f'Ошибка обработки KKSp {kksp}, изменения KKSp отменены')
+                raise
             self._connection.commit()
         logging.info('Завершено')
+        # Таблица IED очищается и заполняется только после обработки всех KKSp
+        logging.info('Очистка таблицы IED...')
+        self._connection.clear_table(table_name=self._options.ied_table_name)
+        self._write_ied_records()
+        logging.info('Завершено.')
+
+    def _write_ied_records(self) -> None:
+        """
+        Пакетная запись накопленных записей в таблицу IED
+        :return: None
+        """
+        self._connection.insert_rows(table_name=self._options.ied_table_name,
+                                     column_names=self.IED_COLUMNS,
+                                     rows=self._ied_records)
+        self._ied_records = []
+        self._connection.commit()
+
+    @staticmethod
+    def get_indexes(options: FillMMSAddressOptions) -> list[IndexDescription]:
+        """
+        Индексы, используемые при поиске сигналов и IED по KKSp
+        :param options: Параметры скрипта
+        :return: Список индексов
+        """
+        return [IndexDescription(table_name=options.iec_table_name, columns=['KKSp']),
+                IndexDescription(table_name=options.iec_table_name, columns=['KKS', 'PART']),
+                IndexDescription(table_name=options.mms_table_name, columns=['KKSp'])]
 
     @staticmethod
     def run(options: FillMMSAddressOptions, connection: Connection) -> None:
         logging.info('Запуск скрипта "Заполнение MMS адресов"...')
         with connection:
+            connection.ensure_indexes(FillMMSAdress.get_indexes(options))
             fill_mms_class: FillMMSAdress = FillMMSAdress(options=options,
                                                           connection=connection)
             fill_mms_class._fill_mms()
+            connection.log_query_statistics(stage_name='Заполнение MMS адресов')
         logging.info('Выпонение скрипта "Заполнение MMS адресов" завершено.')
         logging.info('')
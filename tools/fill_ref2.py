@@ -1,8 +1,9 @@
 import logging
 import re
+from collections.abc import Iterator
 from dataclasses import dataclass
 from enum import Enum
-from tools.utils.sql_utils import Connection
+from tools.utils.sql_utils import Connection, PendingResult, IndexDescription, IndexType
 from tools.utils.progress_utils import ProgressBar
 
 brackets_pattern = re.compile('({.+?})+')
@@ -197,6 +198,8 @@ class FillRef2:
     _abonent_map: dict[str, int]
     _alarm_sound_container: dict[Signal, str]
     _warn_sound_container: dict[Signal, str]
+    _ts_odu_logic_signals: dict[tuple[str, str], Signal | None]
+    _port_lookups: dict[tuple, PendingResult]
 
     def __init__(self, options: FillRef2Options, connection: Connection):
         self._options = options
@@ -204,6 +207,8 @@ class FillRef2:
         self._abonent_map = self._get_abonent_map()
         self._alarm_sound_container = {}
         self._warn_sound_container = {}
+        self._ts_odu_logic_signals = {}
+        self._port_lookups = {}
 
     # def _choose_signal_by_kksp(values: list[dict, str], kksp: list[str]) -> tuple[str | None, str | None, ErrorType]:
     def _choose_signal_by_kksp(self, values: list[dict[str, str]], kksp: list[str]) -> tuple[
@@ -226,6 +231,22 @@ class FillRef2:
             return None, None, ErrorType.TOOMANYVALUES
         return signals[0][0], signals[0][1], ErrorType.NOERROR
 
+    def _get_sim_by_kks_queries(self, cabinet: str | None, kks: str, port: InputPort | OutputPort,
+                                schema_kks: str | None) -> list[dict]:
+        key_names: list[str] = ['KKS', 'MODULE', 'PART']
+        key_values: list[str] = [self.transform_kks(kks, schema_kks), '1691', port.part]
+        key_operator = ['LIKE', '<>', '=', '=']
+        if cabinet is not None:
+            key_names.append('CABINET')
+            key_values.append(cabinet)
+            key_operator.append('=')
+        # Заодно загружается из таблицы СиМ ТС ОДУ
+        return [{'table_name': table_name,
+                 'fields': ['KKS', 'KKSp', 'CABINET'],
+                 'key_names': key_names,
+                 'key_values': key_values,
+                 'key_operator': key_operator} for table_name in [self._options.sim_table, self._options.ts_odu_table]]
+
     def _get_signal_from_sim_by_kks(self, cabinet: str | None, kks: str, kksp: list[str] | None,
                                     port: InputPort | OutputPort, schema_kks: str | None = None) -> tuple[
                                         str | None, str | None, ErrorType]:
@@ -237,26 +258,9 @@ class FillRef2:
         :param port: Порт, для которого ищется терминал
         :return: Кортеж из ККС (если найден), имени стойки (если найдена) и кода ошибки
         """
-        key_names: list[str] = ['KKS', 'MODULE', 'PART']
-        key_values: list[str] = [self.transform_kks(kks, schema_kks), '1691', port.part]
-        key_operator = ['LIKE', '<>', '=', '=']
-        if cabinet is not None:
-            key_names.append('CABINET')
-            key_values.append(cabinet)
-            key_operator.append('=')
-        values: list[dict[str, str]] = self._connection.retrieve_data(
-            table_name=self._options.sim_table,
-            fields=['KKS', 'KKSp', 'CABINET'],
-            key_names=key_names,
-            key_values=key_values,
-            key_operator=key_operator)
-        # Заодно загружается из таблицы СиМ ТС ОДУ
-        values += self._connection.retrieve_data(
-            table_name=self._options.ts_odu_table,
-            fields=['KKS', 'KKSp', 'CABINET'],
-            key_names=key_names,
-            key_values=key_values,
-            key_operator=key_operator)
+        values: list[dict[str, str]] = []
+        for query in self._get_sim_by_kks_queries(cabinet=cabinet, kks=kks, port=port, schema_kks=schema_kks):
+            values += self._retrieve_lookup(query)
         if len(values) > 1:
             # Если не задана стойка и KKSp, то для нескольких сигналов будет попытка выбрать один, относящийся
             # к данному терминалу
@@ -273,6 +277,21 @@ class FillRef2:
             return (values[0][self._connection.modify_column_name('KKS')],
                     values[0][self._connection.modify_column_name('CABINET')], ErrorType.NOERROR)
 
+    def _get_iec_by_kks_query(self, kks: str, port: InputPort | OutputPort, cabinet: str | None,
+                              schema_kks: str | None) -> dict:
+        key_names = ['KKS', 'PART']
+        key_values = [self.transform_kks(kks, schema_kks), port.part]
+        key_operator = ['LIKE', '=']
+        if cabinet is not None:
+            key_names.append('CABINET')
+            key_values.append(cabinet)
+            key_operator.append('=')
+        return {'table_name': self._options.iec_table,
+                'fields': ['KKS', 'KKSp', 'CABINET'],
+                'key_names': key_names,
+                'key_values': key_values,
+                'key_operator': key_operator}
+
     def _get_signal_from_iec_by_kks(self, kks: str, kksp: list[str] | None,
                                     port: InputPort | OutputPort, cabinet: str | None,
                                     schema_kks: str | None = None) -> tuple[str | None,
@@ -285,19 +304,8 @@ class FillRef2:
         :param port: Порт, для которого ищется терминал
         :return: Кортеж из ККС (если найден), имени стойки (если найдена) и кода ошибки
         """
-        key_names = ['KKS', 'PART']
-        key_values = [self.transform_kks(kks, schema_kks), port.part]
-        key_operator = ['LIKE', '=']
-        if cabinet is not None:
-            key_names.append('CABINET')
-            key_values.append(cabinet)
-            key_operator.append('=')
-
-        values: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.iec_table,
-                                                                      fields=['KKS', 'KKSp', 'CABINET'],
-                                                                      key_names=key_names,
-                                                                      key_values=key_values,
-                                                                      key_operator=key_operator)
+        values: list[dict[str, str]] = self._retrieve_lookup(
+            self._get_iec_by_kks_query(kks=kks, port=port, cabinet=cabinet, schema_kks=schema_kks))
         if len(values) > 1:
             # Если не задана стойка и KKSp, то для нескольких сигналов будет попытка выбрать один, относящийся
             # к данному терминалу
@@ -312,6 +320,21 @@ class FillRef2:
                     values[0][self._connection.modify_column_name('CABINET')], ErrorType.NOERROR)
         return None, None, ErrorType.NOVALUES
 
+    def _get_sim_by_cabinet_query(self, port: InputPort | OutputPort, cabinet: str,
+                                  schema_kks: str | None) -> dict:
+        key_names = ['MODULE', 'PART', 'CABINET']
+        key_values = ['1691', port.part, cabinet]
+        key_operator = ['<>', '=', '=']
+        if port.kks is not None:
+            key_names.append('KKS')
+            key_values.append(self.transform_kks(port.kks, schema_kks))
+            key_operator.append('LIKE')
+        return {'table_name': self._options.sim_table,
+                'fields': ['KKS', 'CABINET', 'KKSp'],
+                'key_names': key_names,
+                'key_values': key_values,
+                'key_operator': key_operator}
+
     def _get_signal_from_sim_by_cabinet(self, kksp: list[str], port: InputPort | OutputPort, cabinet: str,
                                         schema_kks: str | None = None) -> \
             tuple[str | None, ErrorType]:
@@ -322,20 +345,8 @@ class FillRef2:
         :param cabinet: Имя стойки
         :return: Кортеж из ККС (если найден) и кода ошибки
         """
-        key_names = ['MODULE', 'PART', 'CABINET']
-        key_values = ['1691', port.part, cabinet]
-        key_operator = ['<>', '=', '=']
-        if port.kks is not None:
-            key_names.append('KKS')
-            key_values.append(self.transform_kks(port.kks, schema_kks))
-            key_operator.append('LIKE')
-
-        values: list[dict[str, str]] = self._connection.retrieve_data(
-            table_name=self._options.sim_table,
-            fields=['KKS', 'CABINET', 'KKSp'],
-            key_names=key_names,
-            key_values=key_values,
-            key_operator=key_operator)
+        values: list[dict[str, str]] = self._retrieve_lookup(
+            self._get_sim_by_cabinet_query(port=port, cabinet=cabinet, schema_kks=schema_kks))
         if len(values) > 1:
             kks, cabinet, error = self._choose_signal_by_kksp(values=values,
                                                               kksp=kksp)
@@ -344,6 +355,21 @@ class FillRef2:
             return values[0][self._connection.modify_column_name('KKS')], ErrorType.NOERROR
         return None, ErrorType.NOVALUES
 
+    def _get_iec_by_cabinet_query(self, port: InputPort | OutputPort, cabinet: str,
+                                  schema_kks: str | None) -> dict:
+        key_names = ['PART', 'CABINET']
+        key_values = [port.part, cabinet]
+        key_operator = ['=', '=']
+        if port.kks is not None:
+            key_names.append('KKS')
+            key_values.append(self.transform_kks(port.kks, schema_kks))
+            key_operator.append('LIKE')
+        return {'table_name': self._options.iec_table,
+                'fields': ['KKS', 'KKSp', 'CABINET'],
+                'key_names': key_names,
+                'key_values': key_values,
+                'key_operator': key_operator}
+
     def _get_signal_from_iec_by_cabinet(self, kksp: list[str], port: InputPort | OutputPort, cabinet: str,
                                         schema_kks: str | None = None) -> \
             tuple[str | None, ErrorType]:
@@ -354,20 +380,8 @@ class FillRef2:
         :param cabinet: Имя стойки
         :return: Кортеж из ККС (если найден) и кода ошибки
         """
-        key_names = ['PART', 'CABINET']
-        key_values = [port.part, cabinet]
-        key_operator = ['=', '=']
-        if port.kks is not None:
-            key_names.append('KKS')
-            key_values.append(self.transform_kks(port.kks, schema_kks))
-            key_operator.append('LIKE')
-
-        values: list[dict[str, str]] = self._connection.retrieve_data(
-            table_name=self._options.iec_table,
-            fields=['KKS', 'KKSp', 'CABINET'],
-            key_names=key_names,
-            key_values=key_values,
-            key_operator=key_operator)
+        values: list[dict[str, str]] = self._retrieve_lookup(
+            self._get_iec_by_cabinet_query(port=port, cabinet=cabinet, schema_kks=schema_kks))
         if len(values) > 1:
             kks, cabinet, error = self._choose_signal_by_kksp(values=values,
                                                               kksp=kksp)
@@ -376,6 +390,46 @@ class FillRef2:
             return values[0][self._connection.modify_column_name('KKS')], ErrorType.NOERROR
         return None, ErrorType.NOVALUES
 
+    @staticmethod
+    def _get_lookup_key(query: dict) -> tuple:
+        return (query['table_name'], tuple(query['fields']), tuple(query['key_names']), tuple(query['key_values']),
+                tuple(query['key_operator']))
+
+    def _retrieve_lookup(self, query: dict) -> list[dict[str, str]]:
+        """
+        Выполнение запроса поиска сигнала. Если запрос был заранее отправлен в конвейере
+        (_prefetch_signals_for_ports), используется его результат
+        :param query: Параметры запроса retrieve_data
+        :return: Строки результата запроса (новый список)
+        """
+        pending_result: PendingResult | None = self._port_lookups.get(self._get_lookup_key(query))
+        if pending_result is not None:
+            return list(pending_result.result())
+        return self._connection.retrieve_data(**query)
+
+    def _prefetch_signals_for_ports(self, schema_kks: str, cabinet: str,
+                                    ports: list[InputPort | OutputPort]) -> None:
+        """
+        Отправка в одном конвейере запросов первого шага каскада поиска сигнала (поиск в таблицах СиМ по KKS
+        и PART) для всех портов шаблона. Обычно сигнал находится на первом шаге, остальные шаги каскада
+        выполняются по необходимости
+        :param schema_kks: KKS схемы управления
+        :param cabinet: Имя стойки
+        :param ports: Порты шаблона
+        :return: None
+        """
+        if not self._connection.is_pipeline_supported():
+            # Без конвейера предварительная загрузка ничего не дает
+            return
+        with self._connection.pipeline() as pipeline:
+            for port in ports:
+                kks: str = port.kks if port.kks is not None else schema_kks
+                for query in self._get_sim_by_kks_queries(cabinet=cabinet, kks=kks, port=port,
+                                                          schema_kks=schema_kks):
+                    lookup_key: tuple = self._get_lookup_key(query)
+                    if lookup_key not in self._port_lookups:
+                        self._port_lookups[lookup_key] = pipeline.retrieve_data(**query)
+
     def _get_signal_for_port(self, schema_kks: str, cabinet: str, kksp: list[str] | None, port: InputPort | OutputPort,
                              template_name) -> Signal | None:
         """
@@ -570,8 +624,7 @@ class FillRef2:
                       f'с PART {port.part}')
         return None
 
-    def _get_signal_from_predefined_schemas(self, kks: str, port: InputPort | OutputPort, cabinet: str | None,
-                                            kksp: list[str] | None):
+    def _get_predefined_schemas_query(self, kks: str, port: InputPort | OutputPort, cabinet: str | None) -> dict:
         key_names = ['KKS', 'PART']
         key_values = [kks, port.part]
         key_operator = ['LIKE', '=']
@@ -579,13 +632,16 @@ class FillRef2:
             key_names.append('CABINET')
             key_values.append(cabinet)
             key_operator.append('=')
+        return {'table_name': self._options.predifend_control_schemas_table,
+                'fields': ['KKS', 'CABINET'],
+                'key_names': key_names,
+                'key_values': key_values,
+                'key_operator': key_operator}
 
-        values: list[dict[str, str]] = self._connection.retrieve_data(
-            table_name=self._options.predifend_control_schemas_table,
-            fields=['KKS', 'CABINET'],
-            key_names=key_names,
-            key_values=key_values,
-            key_operator=key_operator)
+    def _get_signal_from_predefined_schemas(self, kks: str, port: InputPort | OutputPort, cabinet: str | None,
+                                            kksp: list[str] | None):
+        values: list[dict[str, str]] = self._retrieve_lookup(
+            self._get_predefined_schemas_query(kks=kks, port=port, cabinet=cabinet))
         if len(values) > 1:
             # Если не задана стойка и KKSp, то для нескольких сигналов будет попытка выбрать один, относящийся
             # к данному терминалу
@@ -614,8 +670,7 @@ class FillRef2:
         else:
             return kks
 
-    def _get_signal_from_fake_signals(self, kks: str, port: InputPort | OutputPort, cabinet: str | None,
-                                      kksp: list[str] | None):
+    def _get_fake_signals_query(self, kks: str, port: InputPort | OutputPort, cabinet: str | None) -> dict:
         key_names = ['KKS', 'PART']
         key_values = [kks, port.part]
         key_operator = ['LIKE', '=']
@@ -623,13 +678,16 @@ class FillRef2:
             key_names.append('CABINET')
             key_values.append(cabinet)
             key_operator.append('=')
+        return {'table_name': self._options.fake_signals_table,
+                'fields': ['KKS', 'CABINET', 'KKSp'],
+                'key_names': key_names,
+                'key_values': key_values,
+                'key_operator': key_operator}
 
-        values: list[dict[str, str]] = self._connection.retrieve_data(
-            table_name=self._options.fake_signals_table,
-            fields=['KKS', 'CABINET', 'KKSp'],
-            key_names=key_names,
-            key_values=key_values,
-            key_operator=key_operator)
+    def _get_signal_from_fake_signals(self, kks: str, port: InputPort | OutputPort, cabinet: str | None,
+                                      kksp: list[str] | None):
+        values: list[dict[str, str]] = self._retrieve_lookup(
+            self._get_fake_signals_query(kks=kks, port=port, cabinet=cabinet))
         if len(values) > 1:
             # Если не задана стойка и KKSp, то для нескольких сигналов будет попытка выбрать один, относящийся
             # к данному терминалу
@@ -886,53 +944,74 @@ class FillRef2:
 
     def _get_signal_for_ts_odu_logic(self, kks: str, part: str) -> \
             tuple[Signal | None, ErrorType]:
-        values_from_sim: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.sim_table,
-                                                                               fields=['CABINET'],
-                                                                               key_names=['KKS', 'PART', 'MODULE'],
-                                                                               key_values=[kks, part, '1691'],
-                                                                               key_operator=['=', '=', '<>'])
-        if len(values_from_sim) == 1:
-            cabinet: str = values_from_sim[0][self._connection.modify_column_name('CABINET')]
-            return Signal(kks=kks,
-                          part=part,
-                          cabinet=cabinet,
-                          type=SignalType.WIRED), ErrorType.NOERROR
-        values_from_iec: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.iec_table,
-                                                                               fields=['CABINET'],
-                                                                               key_names=['KKS', 'PART'],
-                                                                               key_values=[kks, part])
-        if len(values_from_iec) == 1:
-            cabinet: str = values_from_iec[0][self._connection.modify_column_name('CABINET')]
-            return Signal(kks=kks,
-                          part=part,
-                          cabinet=cabinet,
-                          type=SignalType.DIGITAL), ErrorType.NOERROR
+        if (kks, part) not in self._ts_odu_logic_signals:
+            self._load_signals_for_ts_odu_logic(keys=[(kks, part)])
+        signal: Signal | None = self._ts_odu_logic_signals[(kks, part)]
+        if signal is None:
+            logging.error(f'Сигнал {kks}_{part} не найден ни в одной таблице')
+            return None, ErrorType.NOVALUES
+        return signal, ErrorType.NOERROR
 
-        values_from_fake: list[dict[str, str]] = self._connection.retrieve_data(
+    def _load_signals_for_ts_odu_logic(self, keys: list[tuple[str, str]]) -> None:
+        """
+        Пакетный поиск сигналов для логики ТС ОДУ последовательно в таблицах СиМ, МЭК, фейковых сигналов и
+        СиМ ТС ОДУ
+        :param keys: Список пар KKS, PART
+        :return: None
+        """
+        keys = [key for key in dict.fromkeys(keys) if key not in self._ts_odu_logic_signals]
+        if len(keys) == 0:
+            return
+        values_from_sim: dict[tuple[str | None, ...], list[dict[str, str]]] = self._connection.retrieve_data_many(
+            table_name=self._options.sim_table,
+            fields=['CABINET', 'MODULE'],
+            key_names=['KKS', 'PART'],
+            key_values_list=keys)
+        values_from_iec: dict[tuple[str | None, ...], list[dict[str, str]]] = self._connection.retrieve_data_many(
+            table_name=self._options.iec_table,
+            fields=['CABINET'],
+            key_names=['KKS', 'PART'],
+            key_values_list=keys)
+        values_from_fake: dict[tuple[str | None, ...], list[dict[str, str]]] = self._connection.retrieve_data_many(
             table_name=self._options.fake_signals_table,
             fields=['CABINET'],
             key_names=['KKS', 'PART'],
-            key_values=[kks, part])
-
-        if len(values_from_fake) == 1:
-            cabinet: str = values_from_fake[0][self._connection.modify_column_name('CABINET')]
-            return Signal(kks=kks,
-                          part=part,
-                          cabinet=cabinet,
-                          type=SignalType.WIRED), ErrorType.NOERROR
-
-        values_from_ts_odu: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.ts_odu_table,
-                                                                                  fields=['CABINET'],
-                                                                                  key_names=['KKS', 'PART'],
-                                                                                  key_values=[kks, part])
-        if len(values_from_ts_odu) == 1:
-            cabinet: str = values_from_ts_odu[0][self._connection.modify_column_name('CABINET')]
-            return Signal(kks=kks,
-                          part=part,
-                          cabinet=cabinet,
-                          type=SignalType.TS_ODU), ErrorType.NOERROR
-        logging.error(f'Сигнал {kks}_{part} не найден ни в одной таблице')
-        return None, ErrorType.NOVALUES
+            key_values_list=keys)
+        values_from_ts_odu: dict[tuple[str | None, ...], list[dict[str, str]]] = \
+            self._connection.retrieve_data_many(table_name=self._options.ts_odu_table,
+                                                fields=['CABINET'],
+                                                key_names=['KKS', 'PART'],
+                                                key_values_list=keys)
+        cabinet_column: str = self._connection.modify_column_name('CABINET')
+        module_column: str = self._connection.modify_column_name('MODULE')
+        for kks, part in keys:
+            key: tuple[str | None, ...] = tuple(None if value is None else str(value) for value in (kks, part))
+            # В таблице СиМ учитываются только проводные сигналы (MODULE <> 1691)
+            sim_values: list[dict[str, str]] = [value for value in values_from_sim[key]
+                                                if value[module_column] is not None and
+                                                value[module_column] != '1691']
+            signal: Signal | None = None
+            if len(sim_values) == 1:
+                signal = Signal(kks=kks,
+                                part=part,
+                                cabinet=sim_values[0][cabinet_column],
+                                type=SignalType.WIRED)
+            elif len(values_from_iec[key]) == 1:
+                signal = Signal(kks=kks,
+                                part=part,
+                                cabinet=values_from_iec[key][0][cabinet_column],
+                                type=SignalType.DIGITAL)
+            elif len(values_from_fake[key]) == 1:
+                signal = Signal(kks=kks,
+                                part=part,
+                                cabinet=values_from_fake[key][0][cabinet_column],
+                                type=SignalType.WIRED)
+            elif len(values_from_ts_odu[key]) == 1:
+                signal = Signal(kks=kks,
+                                part=part,
+                                cabinet=values_from_ts_odu[key][0][cabinet_column],
+                                type=SignalType.TS_ODU)
+            self._ts_odu_logic_signals[(kks, part)] = signal
 
     def _process_or_schemas(self) -> tuple[list[VirtualSchema], list[SignalRef], list[tuple[str, str, str]]] | None:
         ok_flag: bool = True
@@ -946,6 +1025,9 @@ class FillRef2:
             fields=['KKS', 'PART', 'CABINET', 'INST_PLACE', 'TS_ODU_PANEL', 'TYPE'])
         logging.info('Запуск обработки логики ТС ОДУ...')
         if len(values) > 0:
+            self._load_signals_for_ts_odu_logic(keys=[(value[self._connection.modify_column_name('KKS')],
+                                                       value[self._connection.modify_column_name('PART')])
+                                                      for value in values])
             ProgressBar.config(max_value=len(values), step=1, prefix='Обработка логики ТС ОДУ', suffix='Завершено',
                                length=50)
             for value in values:
@@ -995,6 +1077,10 @@ class FillRef2:
         logging.info('Запуск обработки сигналов ТС ОДУ...')
         refs: list[SignalRef] = []
         if len(values) > 0:
+            self._load_signals_for_ts_odu_logic(
+                keys=[(port.kks, port.part)
+                      for template in [self._options.ts_odu_templates_lamp, self._options.ts_odu_templates_displ]
+                      for port in (template.input_ports or []) + (template.output_ports or [])])
             ProgressBar.config(max_value=len(values), step=1, prefix='Обработка сигналов ТС ОДУ', suffix='Завершено',
                                length=50)
             for value in values:
@@ -1481,32 +1567,37 @@ class FillRef2:
                 descr_rus='ПредЗвук',
                 descr_eng='WarnSound')] = template.warn_sound_signal_port
         input_port_list: list[InputPort] | None = template.input_ports[schema_part]
-        if input_port_list is not None:
-            for port in input_port_list:
-                signal_ref: SignalRef | None = self._creare_ref_for_input_port(schema_kks=schema_kks,
-                                                                               schema_part=schema_part,
-                                                                               cabinet=schema_cabinet,
-                                                                               input_port=port,
-                                                                               kksp=kksp,
-                                                                               template_name=template_name,
-                                                                               add_kks_postfix=add_kks_postfix)
-                if signal_ref is None:
-                    return None
-                ref_list.append(signal_ref)
-
         output_port_list: list[OutputPort] | None = template.output_ports[schema_part]
-        if output_port_list is not None:
-            for port in output_port_list:
-                signal_ref: list[SignalRef] | None = self._creare_ref_for_output_port(schema_kks=schema_kks,
-                                                                                      schema_part=schema_part,
-                                                                                      cabinet=schema_cabinet,
-                                                                                      output_port=port,
-                                                                                      kksp=kksp,
-                                                                                      template_name=template_name,
-                                                                                      add_kks_postfix=add_kks_postfix)
-                if signal_ref is None:
-                    return None
-                ref_list += signal_ref
+        self._prefetch_signals_for_ports(schema_kks=schema_kks, cabinet=schema_cabinet,
+                                         ports=(input_port_list or []) + (output_port_list or []))
+        try:
+            if input_port_list is not None:
+                for port in input_port_list:
+                    signal_ref: SignalRef | None = self._creare_ref_for_input_port(schema_kks=schema_kks,
+                                                                                   schema_part=schema_part,
+                                                                                   cabinet=schema_cabinet,
+                                                                                   input_port=port,
+                                                                                   kksp=kksp,
+                                                                                   template_name=template_name,
+                                                                                   add_kks_postfix=add_kks_postfix)
+                    if signal_ref is None:
+                        return None
+                    ref_list.append(signal_ref)
+            if output_port_list is not None:
+                for port in output_port_list:
+                    signal_ref: list[SignalRef] | None = self._creare_ref_for_output_port(
+                        schema_kks=schema_kks,
+                        schema_part=schema_part,
+                        cabinet=schema_cabinet,
+                        output_port=port,
+                        kksp=kksp,
+                        template_name=template_name,
+                        add_kks_postfix=add_kks_postfix)
+                    if signal_ref is None:
+                        return None
+                    ref_list += signal_ref
+        finally:
+            self._port_lookups.clear()
         if template.ts_odu_data is not None:
             refs: list[SignalRef] | None = self._get_refs_for_ts_odu_in_define_schema(schema_kks=schema_kks,
                                                                                       schema_part=schema_part,
@@ -1526,63 +1617,55 @@ class FillRef2:
         :param ref_list: Список со ссылками
         :return: None
         """
-        for ref in ref_list:
-            self._connection.insert_row(table_name=self._options.ref_table,
-                                        column_names=['KKS', 'PART', 'REF', 'UNREL_REF'],
-                                        values=[ref.kks, ref.part, ref.ref, ref.unrel_ref])
+        self._connection.insert_rows(table_name=self._options.ref_table,
+                                     column_names=['KKS', 'PART', 'REF', 'UNREL_REF'],
+                                     rows=[[ref.kks, ref.part, ref.ref, ref.unrel_ref] for ref in ref_list])
         self._connection.commit()
 
     def _write_control_schemas(self, dynamic_schemas: list[VirtualSchema]):
-        values: list[dict[str, str]] = self._connection.retrieve_data(
+        columns: list[str] = ['KKS', 'CABINET', 'SCHEMA', 'CHANNEL', 'PART', 'DESCR_RUS', 'DESCR_ENG']
+        values: Iterator[dict[str, str]] = self._connection.iter_data(
             table_name=self._options.predifend_control_schemas_table,
             fields=['KKS', 'CABINET', 'SCHEMA', 'CHANNEL', 'PART', 'DESCR_RUS', 'DESCR_ENG'],
             key_names=['ONLY_FOR_REF'],
             key_values=[False])
-        for value in values:
-            self._connection.insert_row(table_name=self._options.control_schemas_table,
-                                        column_names=['KKS', 'CABINET', 'SCHEMA', 'CHANNEL', 'PART', 'DESCR_RUS',
-                                                      'DESCR_ENG'],
-                                        values=[value[self._connection.modify_column_name('KKS')] +
-                                                self._options.control_schema_name_postfix,
-                                                value[self._connection.modify_column_name('CABINET')],
-                                                value[self._connection.modify_column_name('SCHEMA')],
-                                                value[self._connection.modify_column_name('CHANNEL')],
-                                                value[self._connection.modify_column_name('PART')],
-                                                value[self._connection.modify_column_name('DESCR_RUS')],
-                                                value[self._connection.modify_column_name('DESCR_ENG')]])
-        values: list[dict[str, str]] = self._connection.retrieve_data(
+        self._connection.insert_rows(table_name=self._options.control_schemas_table,
+                                     column_names=columns,
+                                     rows=([value[self._connection.modify_column_name('KKS')] +
+                                            self._options.control_schema_name_postfix,
+                                            value[self._connection.modify_column_name('CABINET')],
+                                            value[self._connection.modify_column_name('SCHEMA')],
+                                            value[self._connection.modify_column_name('CHANNEL')],
+                                            value[self._connection.modify_column_name('PART')],
+                                            value[self._connection.modify_column_name('DESCR_RUS')],
+                                            value[self._connection.modify_column_name('DESCR_ENG')]]
+                                           for value in values))
+        values: Iterator[dict[str, str]] = self._connection.iter_data(
             table_name=self._options.fake_signals_table,
             fields=['KKS', 'CABINET', 'SCHEMA', 'PART', 'DESCR_RUS', 'DESCR_ENG'])
-        for value in values:
-            self._connection.insert_row(table_name=self._options.control_schemas_table,
-                                        column_names=['KKS', 'CABINET', 'SCHEMA', 'CHANNEL', 'PART', 'DESCR_RUS',
-                                                      'DESCR_ENG'],
-                                        values=[value[self._connection.modify_column_name('KKS')],
-                                                value[self._connection.modify_column_name('CABINET')],
-                                                value[self._connection.modify_column_name('SCHEMA')],
-                                                '0',
-                                                value[self._connection.modify_column_name('PART')],
-                                                value[self._connection.modify_column_name('DESCR_RUS')],
-                                                value[self._connection.modify_column_name('DESCR_ENG')]])
-        for dynamic_schema in dynamic_schemas:
-            self._connection.insert_row(table_name=self._options.control_schemas_table,
-                                        column_names=['KKS', 'CABINET', 'SCHEMA', 'CHANNEL', 'PART', 'DESCR_RUS',
-                                                      'DESCR_ENG'],
-                                        values=[dynamic_schema.kks, dynamic_schema.cabinet, dynamic_schema.schema,
-                                                dynamic_schema.channel, dynamic_schema.part, dynamic_schema.descr_rus,
-                                                dynamic_schema.descr_eng])
+        self._connection.insert_rows(table_name=self._options.control_schemas_table,
+                                     column_names=columns,
+                                     rows=([value[self._connection.modify_column_name('KKS')],
+                                            value[self._connection.modify_column_name('CABINET')],
+                                            value[self._connection.modify_column_name('SCHEMA')],
+                                            '0',
+                                            value[self._connection.modify_column_name('PART')],
+                                            value[self._connection.modify_column_name('DESCR_RUS')],
+                                            value[self._connection.modify_column_name('DESCR_ENG')]]
+                                           for value in values))
+        self._connection.insert_rows(table_name=self._options.control_schemas_table,
+                                     column_names=columns,
+                                     rows=[[dynamic_schema.kks, dynamic_schema.cabinet, dynamic_schema.schema,
+                                            dynamic_schema.channel, dynamic_schema.part, dynamic_schema.descr_rus,
+                                            dynamic_schema.descr_eng]
+                                           for dynamic_schema in dynamic_schemas])
         self._connection.commit()
 
     def _update_schemas(self, updated_schemas: list[tuple[str, str, str]]):
-        for schema in updated_schemas:
-            kks: str = schema[0]
-            part: str = schema[1]
-            name: str = schema[2]
-            self._connection.update_field(table_name=self._options.ts_odu_table,
-                                          fields=['SCHEMA'],
-                                          values=[name],
-                                          key_names=['KKS', 'PART'],
-                                          key_values=[kks, part])
+        self._connection.update_fields_bulk(table_name=self._options.ts_odu_table,
+                                            fields=['SCHEMA'],
+                                            key_names=['KKS', 'PART'],
+                                            rows=[([kks, part], [name]) for kks, part, name in updated_schemas])
         self._connection.commit()
 
     def _process_custom_schemas_in_ts_odu(self) -> list[SignalRef] | None:
@@ -1647,19 +1730,46 @@ class FillRef2:
         refs: list[SignalRef] = \
             ref_for_predefined_schemas + ts_odu_ref_list + refs_for_ts_odu_signals + sound_refs + custom_refs
         logging.info('Запись результатов...')
-        self._connection.clear_table(table_name=self._options.ref_table)
-        self._connection.clear_table(table_name=self._options.control_schemas_table)
-        self._write_ref(ref_list=refs)
-        self._write_control_schemas(dynamic_schemas=virtual_schemas)
+        with self._connection.staged_tables([self._options.ref_table, self._options.control_schemas_table]):
+            self._write_ref(ref_list=refs)
+            self._write_control_schemas(dynamic_schemas=virtual_schemas)
         self._update_schemas(updated_schemas=updated_schemas + updated_sound_schemas)
         logging.info('Завершено.')
 
+    @staticmethod
+    def get_indexes(options: FillRef2Options) -> list[IndexDescription]:
+        """
+        Индексы, используемые при поиске сигналов для портов шаблонов
+        :param options: Параметры скрипта
+        :return: Список индексов
+        """
+        indexes: list[IndexDescription] = []
+        for table_name in [options.sim_table, options.iec_table]:
+            indexes.append(IndexDescription(table_name=table_name, columns=['PART', 'CABINET']))
+            indexes.append(IndexDescription(table_name=table_name, columns=['KKS'], index_type=IndexType.PATTERN))
+        for table_name in [options.fake_signals_table, options.predifend_control_schemas_table]:
+            indexes.append(IndexDescription(table_name=table_name, columns=['PART']))
+            indexes.append(IndexDescription(table_name=table_name, columns=['KKS'], index_type=IndexType.PATTERN))
+        indexes.append(IndexDescription(table_name=options.ts_odu_table, columns=['INST_PLACE', 'KKSp']))
+        indexes.append(IndexDescription(table_name=options.ts_odu_table, columns=['KKS'],
+                                        index_type=IndexType.PATTERN))
+        return indexes
+
     @staticmethod
     def run(options: FillRef2Options, connection: Connection) -> None:
         logging.info('Запуск скрипта "Расстановка ссылок"...')
         with connection:
+            connection.ensure_indexes(FillRef2.get_indexes(options))
+            # Таблицы-источники не изменяются во время расстановки ссылок
+            connection.enable_result_cache(table_names=[options.sim_table,
+                                                        options.iec_table,
+                                                        options.fake_signals_table,
+                                                        options.ts_odu_table,
+                                                        options.predifend_control_schemas_table,
+                                                        options.abonent_table])
             fill_ref_class: FillRef2 = FillRef2(options=options,
                                                 connection=connection)
             fill_ref_class._process()
+            connection.log_query_statistics(stage_name='Расстановка ссылок')
         logging.info('Выпонение скрипта "Расстановка ссылок" завершено.')
         logging.info('')
@@ -1,9 +1,13 @@
+import hashlib
+import json
 import logging
 import re
-from dataclasses import dataclass, field, fields
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields, Field, is_dataclass
 
 from tools.utils.progress_utils import ProgressBar
-from tools.utils.sql_utils import Connection, BaseType
+from tools.utils.sql_utils import Connection, RowFormat, IndexDescription, SchemaRegistry, BaseType
 
 
 @dataclass(init=True, repr=False, eq=True, order=False, frozen=True)
@@ -22,6 +26,114 @@ class SignalModification:
     new_kks: str | None = None
 
 
+class SignalModificationMatcher:
+    """
+    Поиск шаблона для нетипового сигнала. Регулярные выражения компилируются один раз, шаблоны с точным значением
+    PART (вида ^XB17$) проверяются только для сигналов с этим PART, для шаблонов KKS с постоянным началом
+    (вида ^10BB...) до регулярного выражения проверяется начало KKS. Порядок проверки шаблонов сохраняется
+    """
+    # Шаблон KKS, шаблон PART, постоянное начало KKS, точное значение PART (None - произвольное), исходный шаблон
+    _rules: list[tuple[re.Pattern, re.Pattern, str, str | None, SignalModification]]
+    # PART -> шаблоны, которые могут подойти для сигнала с этим PART
+    _candidates: dict[str, list[tuple[re.Pattern, re.Pattern, str, str | None, SignalModification]]]
+
+    METACHARACTERS: str = '.^$*+?{}[]\\|()'
+
+    def __init__(self, signal_modifications: list[SignalModification]):
+        self._rules = [(re.compile(modification.signal_kks),
+                        re.compile(modification.signal_part),
+                        self._get_literal_prefix(modification.signal_kks),
+                        self._get_literal_value(modification.signal_part),
+                        modification) for modification in signal_modifications]
+        self._candidates = {}
+
+    @staticmethod
+    def _get_literal_prefix(pattern: str) -> str:
+        """
+        Постоянное начало строк, подходящих под шаблон
+        :param pattern: Регулярное выражение
+        :return: Начало строки ('' - если выделить не удалось)
+        """
+        if not pattern.startswith('^') or '|' in pattern:
+            return ''
+        prefix: str = ''
+        for char in pattern[1:]:
+            if char in SignalModificationMatcher.METACHARACTERS:
+                # Символ перед квантификатором может отсутствовать
+                if char in '*?{':
+                    prefix = prefix[:-1]
+                break
+            prefix += char
+        return prefix
+
+    @staticmethod
+    def _get_literal_value(pattern: str) -> str | None:
+        """
+        Единственная строка, подходящая под шаблон вида ^XB17$
+        :param pattern: Регулярное выражение
+        :return: Строка или None, если шаблон не является точным значением
+        """
+        if len(pattern) < 2 or not pattern.startswith('^') or not pattern.endswith('$'):
+            return None
+        value: str = pattern[1:-1]
+        if any(char in SignalModificationMatcher.METACHARACTERS for char in value):
+            return None
+        return value
+
+    def find(self, kks: str, part: str) -> SignalModification | None:
+        """
+        Поиск первого шаблона, подходящего для сигнала
+        :param kks: KKS сигнала
+        :param part: PART сигнала
+        :return: Шаблон или None
+        """
+        candidates: list[tuple[re.Pattern, re.Pattern, str, str | None, SignalModification]] | None = \
+            self._candidates.get(part)
+        if candidates is None:
+            candidates = [rule for rule in self._rules if rule[3] is None or rule[3] == part]
+            self._candidates[part] = candidates
+        for kks_pattern, part_pattern, kks_prefix, _, modification in candidates:
+            if kks.startswith(kks_prefix) and kks_pattern.search(kks) and part_pattern.search(part):
+                return modification
+        return None
+
+
+class PrefixTrie:
+    """
+    Префиксное дерево для проверки, начинается ли строка с одного из заданных префиксов
+    """
+    _root: dict[str, dict]
+
+    # Ключ узла, отмечающий окончание префикса (символы строки не бывают пустыми)
+    END: str = ''
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str) -> None:
+        node: dict[str, dict] = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self.END] = {}
+
+    def has_prefix_of(self, value: str) -> bool:
+        """
+        Проверка, начинается ли строка с одного из префиксов
+        :param value: Строка
+        :return: True, если префикс найден
+        """
+        node: dict[str, dict] | None = self._root
+        for char in value:
+            if self.END in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return self.END in node
+
+
 @dataclass(init=True, repr=False, eq=True, order=False, frozen=True)
 class SWTemplateVariant:
     schema_part: str
@@ -70,41 +182,54 @@ class Signal:
     template: str | None = field(default=None, metadata={'column_name': 'SCHEMA'})
 
     @staticmethod
-    def create_from_row(value: dict[str, str], base_type: BaseType) -> 'Signal':
-        signal: Signal = Signal()
-        for dataclass_field in fields(signal):
-            if 'column_name' in dataclass_field.metadata:
-                if base_type == BaseType.ACCESS:
-                    column_name: str = dataclass_field.metadata['column_name']
-                elif base_type == BaseType.POSTGRES:
-                    match dataclass_field.name:
-                        case 'module':
-                            column_name = 'module_name'
-                        case 'template':
-                            column_name = 'schema_name'
-                        case 'connection':
-                            column_name = 'conn'
-                        case _:
-                            column_name: str = str(dataclass_field.metadata['column_name']).lower()
-                else:
-                    raise Exception("Неподдерживаемый тип DBEngine")
-                if column_name in value:
-                    if value[column_name] is None:
-                        setattr(signal, dataclass_field.name, None)
-                    else:
-                        field_type = dataclass_field.type
-                        if field_type == str or field_type == str | None:
-                            setattr(signal, dataclass_field.name, value[column_name])
-                        elif field_type == int or field_type == int | None:
-                            setattr(signal, dataclass_field.name, int(value[column_name]))
-                        elif field_type == float or field_type == float | None:
-                            setattr(signal, dataclass_field.name, float(value[column_name]))
-                        else:
-                            logging.error(f'Недопустимый тип для поля {dataclass_field.name}')
-                            raise TypeError('Недопустимый тип')
+    def _get_converter(dataclass_field: Field) -> Callable:
+        field_type = dataclass_field.type
+        if field_type == str or field_type == str | None:
+            return lambda value: value if isinstance(value, str) else str(value)
+        elif field_type == int or field_type == int | None:
+            return int
+        elif field_type == float or field_type == float | None:
+            return float
+        else:
+            logging.error(f'Недопустимый тип для поля {dataclass_field.name}')
+            raise TypeError('Недопустимый тип')
 
+    @staticmethod
+    def get_record_fields(columns: list[str], schema_registry: SchemaRegistry) -> list[tuple[str, Callable] | None]:
+        """
+        Сопоставление столбцов запроса полям класса для create_from_record
+        :param columns: Столбцы запроса в порядке значений строки
+        :param schema_registry: Соответствие имен столбцов для базы
+        :return: Для каждого столбца - имя поля и функция преобразования значения (None, если поля нет)
+        """
+        converters: dict[str, Callable] = {dataclass_field.name: Signal._get_converter(dataclass_field)
+                                           for dataclass_field in fields(Signal)}
+        fields_by_column: dict[str, tuple[str, Callable]] = {
+            column_name: (field_name, converters[field_name])
+            for field_name, _, column_name in schema_registry.get_dataclass_columns(Signal)}
+        return [fields_by_column.get(column) for column in columns]
+
+    @staticmethod
+    def create_from_record(values: tuple, record_fields: list[tuple[str, Callable] | None]) -> 'Signal':
+        """
+        Создание сигнала из строки запроса в формате RowFormat.TUPLE
+        :param values: Значения строки
+        :param record_fields: Результат get_record_fields для столбцов запроса
+        :return: Сигнал
+        """
+        signal: Signal = Signal()
+        for value, record_field in zip(values, record_fields):
+            if record_field is not None:
+                setattr(signal, record_field[0], None if value is None else record_field[1](value))
         return signal
 
+    @staticmethod
+    def create_from_row(value: dict[str, str], schema_registry: SchemaRegistry) -> 'Signal':
+        columns: list[str] = list(value.keys())
+        return Signal.create_from_record(values=tuple(value.values()),
+                                         record_fields=Signal.get_record_fields(columns=columns,
+                                                                                schema_registry=schema_registry))
+
     def clone(self) -> 'Signal':
         new_signal: Signal = Signal()
         new_signal.kks = self.kks
@@ -214,6 +339,39 @@ class GenerateTableOptions:
     dps_signals: list[DoublePointSignal]
     sw_templates: list[SWTemplate]
     signal_modifications: None | list[SignalModification] = None
+    # Загрузка таблицы АЭП одним запросом (иначе - отдельный запрос для каждого KKSp)
+    load_aep_table_once: bool = True
+    # Число процессов для параллельной обработки KKSp (1 - последовательная обработка)
+    process_count: int = 1
+    # Таблица отпечатков KKSp для инкрементального заполнения: заново формируются только строки KKSp, для которых
+    # изменились строки таблицы АЭП, параметры или справочные данные (None - таблицы перестраиваются полностью)
+    fingerprint_table_name: str | None = None
+    signal_modification_matcher: SignalModificationMatcher | None = field(init=False, compare=False)
+    # PART сигналов, которые раздваиваются
+    dps_single_parts: frozenset[str] = field(init=False, compare=False)
+    # PART в нижнем регистре (casefold) -> ответный PART раздвоенного сигнала
+    dps_part_pairs: dict[str, str] = field(init=False, compare=False)
+    # PART в верхнем регистре -> префиксы KKS (в верхнем регистре) сигналов, которые не раздваиваются
+    skip_duplicate_prefixes: dict[str, PrefixTrie] = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'signal_modification_matcher',
+                           None if self.signal_modifications is None else
+                           SignalModificationMatcher(self.signal_modifications))
+        object.__setattr__(self, 'dps_single_parts',
+                           frozenset(dps_signal.single_part for dps_signal in self.dps_signals
+                                     if dps_signal.single_part is not None))
+        dps_part_pairs: dict[str, str] = {}
+        # Совпадение с on_part имеет приоритет над совпадением с off_part
+        for dps_signal in self.dps_signals:
+            dps_part_pairs.setdefault(dps_signal.on_part.casefold(), dps_signal.off_part)
+        for dps_signal in self.dps_signals:
+            dps_part_pairs.setdefault(dps_signal.off_part.casefold(), dps_signal.on_part)
+        object.__setattr__(self, 'dps_part_pairs', dps_part_pairs)
+        skip_duplicate_prefixes: dict[str, PrefixTrie] = {}
+        for item_kks, item_part in self.skip_duplicate_signals:
+            skip_duplicate_prefixes.setdefault(item_part.upper(), PrefixTrie()).add(item_kks.upper())
+        object.__setattr__(self, 'skip_duplicate_prefixes', skip_duplicate_prefixes)
 
 
 class GenerateTables:
@@ -223,55 +381,101 @@ class GenerateTables:
     _options: 'GenerateTableOptions'
     _connection: Connection
     _columns_list: dict[str, list[str]]
+    _rows_to_insert: dict[str, tuple[list[str], list[list[str]]]]
+    _areas: dict[str | None, str | None]
+    _ip_addresses: dict[str | None, str | None]
+    _fake_signals: set[tuple[str | None, str | None]]
+    _fake_signal_updates: list[tuple[list[str], list[str]]]
+    # Имя поля -> значения ключа, не найденные в справочной таблице
+    _missing_references: dict[str, set[str | None]]
+    # (KKS, PART, CABINET) -> схемы из таблицы PREDEFINED_SCHEMAS
+    _sw_schemas: dict[tuple[str | None, ...], list[str]]
+    # (KKSp, CABINET) -> PART сигналов обрабатываемого KKSp
+    _aep_parts: dict[tuple[str | None, ...], frozenset[str]]
+    # (шаблон SW, набор PART стойки терминала) -> вариант подключения (None - не найден)
+    _sw_variants: dict[tuple[SWTemplate, frozenset[str]], SWTemplateVariant | None]
+    # Отложенные записи в базу (имя метода соединения, аргументы). None - запись выполняется сразу
+    _deferred_writes: list[tuple[str, dict]] | None
+    _report_progress: bool
+
+    # Параметры, не влияющие на содержимое таблиц (не учитываются в отпечатках KKSp)
+    FINGERPRINT_EXCLUDED_OPTIONS: set[str] = {'load_aep_table_once', 'process_count', 'fingerprint_table_name'}
 
     def __init__(self, options: GenerateTableOptions, connection: Connection):
         self._options = options
         self._connection = connection
         self._columns_list = {}
+        self._rows_to_insert = {}
+        self._areas = {}
+        self._ip_addresses = {}
+        self._fake_signals = set()
+        self._fake_signal_updates = []
+        self._missing_references = {}
+        self._sw_schemas = {}
+        self._aep_parts = {}
+        self._sw_variants = {}
+        self._deferred_writes = None
+        self._report_progress = True
 
-    def _get_column_set(self, signal_type: dataclass) -> set[str]:
-        columns: set[str] = set()
-        for dataclass_field in fields(signal_type):
-            if self._connection.get_base_type() == BaseType.ACCESS:
-                if 'column_name' in dataclass_field.metadata:
-                    columns.add(dataclass_field.metadata['column_name'])
-            elif self._connection.get_base_type() == BaseType.POSTGRES:
-                match dataclass_field.name:
-                    case 'template':
-                        columns.add('schema_name')
-                    case 'connection':
-                        columns.add('conn')
-                    case 'module':
-                        columns.add('module_name')
-                    case _:
-                        columns.add(str(dataclass_field.metadata['column_name']).lower())
-            else:
-                raise Exception("Неподдерживаемый тип DBEngine")
-        return columns
+    def _queue_row(self, table_name: str, columns: list[str], values: list[str]) -> None:
+        """
+        Добавление строки в буфер для последующей пакетной записи
+        :param table_name: Имя таблицы
+        :param columns: Имена столбцов
+        :param values: Значения
+        :return: None
+        """
+        if table_name in self._rows_to_insert and self._rows_to_insert[table_name][0] != columns:
+            self._flush_rows()
+        if table_name not in self._rows_to_insert:
+            self._rows_to_insert[table_name] = (columns, [])
+        self._rows_to_insert[table_name][1].append(values)
 
-    def _get_columns_and_values(self, signal: dataclass, columns_from_table: list[str]) -> tuple[list[str], list[str]]:
+    def _flush_rows(self) -> None:
+        """
+        Пакетная запись накопленных строк в базу
+        :return: None
+        """
+        for table_name, (columns, rows) in self._rows_to_insert.items():
+            self._write('insert_rows',
+                        table_name=table_name,
+                        column_names=columns,
+                        rows=rows)
+        self._rows_to_insert.clear()
+        if len(self._fake_signal_updates) > 0:
+            self._write('update_fields_bulk',
+                        table_name=self._options.fake_signals_table_name,
+                        fields=['DESCR_RUS', 'DESCR_ENG', 'CABINET', 'KKSP', 'CatNam'],
+                        key_names=['KKS', 'PART'],
+                        rows=self._fake_signal_updates)
+            self._fake_signal_updates = []
+
+    def _write(self, method_name: str, **kwargs) -> None:
+        """
+        Запись в базу через метод соединения. В процессах параллельной обработки запись откладывается и
+        выполняется основным процессом
+        :param method_name: Имя метода соединения
+        :param kwargs: Аргументы метода
+        :return: None
+        """
+        if self._deferred_writes is not None:
+            self._deferred_writes.append((method_name, kwargs))
+        else:
+            getattr(self._connection, method_name)(**kwargs)
+
+    def _get_column_set(self, signal_type: type) -> set[str]:
+        return {column_name for _, _, column_name in
+                self._connection.get_schema_registry().get_dataclass_columns(signal_type)}
+
+    def _get_columns_and_values(self, signal: Signal | DigitalSignal,
+                                columns_from_table: list[str]) -> tuple[list[str], list[str]]:
         columns: list[str] = []
         values: list[str] = []
-        for dataclass_field in fields(signal):
-            if 'column_name' in dataclass_field.metadata:
-                column_name: str
-                if self._connection.get_base_type() == BaseType.ACCESS:
-                    column_name = dataclass_field.metadata['column_name']
-                elif self._connection.get_base_type() == BaseType.POSTGRES:
-                    match dataclass_field.name:
-                        case 'template':
-                            column_name = 'schema_name'
-                        case 'module':
-                            column_name = 'module_name'
-                        case 'connection':
-                            column_name = 'conn'
-                        case _:
-                            column_name = str(dataclass_field.metadata['column_name']).lower()
-                else:
-                    raise Exception("Неподдерживаемый тип DBEngine")
-                if column_name in columns_from_table:
-                    columns.append(dataclass_field.metadata['column_name'])
-                    values.append(getattr(signal, dataclass_field.name))
+        for field_name, logical_name, column_name in \
+                self._connection.get_schema_registry().get_dataclass_columns(type(signal)):
+            if column_name in columns_from_table:
+                columns.append(logical_name)
+                values.append(getattr(signal, field_name))
         return columns, values
 
     def _get_kksp_list(self) -> list[str]:
@@ -291,32 +495,157 @@ class GenerateTables:
             kksp_list.append(value[self.get_column_name(self._connection.modify_column_name('KKSp'))])
         return kksp_list
 
-    def _generate_table_for_kksp(self, kksp: str) -> None:
+    def _load_aep_table(self) -> dict[str | None, list[tuple]]:
+        """
+        Потоковая загрузка всей таблицы АЭП одним запросом с группировкой строк по KKSp
+        :return: Словарь, где ключ - KKSp, значение - строки таблицы АЭП (RowFormat.TUPLE)
+        """
+        columns: list[str] = self._columns_list[self._options.aep_table_name]
+        kksp_column: int = columns.index(self.get_column_name('KKSp'))
+        values_by_kksp: dict[str | None, list[tuple]] = {}
+        for value in self._connection.iter_data(table_name=self._options.aep_table_name,
+                                                fields=columns,
+                                                batch_size=10000,
+                                                row_factory=RowFormat.TUPLE):
+            values_by_kksp.setdefault(value[kksp_column], []).append(value)
+        return values_by_kksp
+
+    def _generate_table_for_kksp(self, kksp: str | None, values: list[tuple] | None = None) -> None:
         """
         Функция запуска генерации таблиц для одного KKSp
         :param kksp: KKSp для генерации
+        :param values: Строки таблицы АЭП для KKSp (RowFormat.TUPLE). Если None, строки загружаются из базы
         :return: None
         """
 
-        values: list[dict[str, str]] = \
-            self._connection.retrieve_data(table_name=self._options.aep_table_name,
-                                           fields=self._columns_list[self._options.aep_table_name],
-                                           key_names=['KKSp'],
-                                           key_values=[kksp])
+        columns: list[str] = self._columns_list[self._options.aep_table_name]
+        if values is None:
+            values = self._connection.retrieve_data(table_name=self._options.aep_table_name,
+                                                    fields=columns,
+                                                    key_names=['KKSp'],
+                                                    key_values=[kksp],
+                                                    row_factory=RowFormat.TUPLE)
+        record_fields: list[tuple[str, Callable] | None] = Signal.get_record_fields(
+            columns=columns, schema_registry=self._connection.get_schema_registry())
+        part_column: int = columns.index(self.get_column_name('PART'))
+        kksp_column: int = columns.index(self.get_column_name('KKSp'))
+        cabinet_column: int = columns.index(self.get_column_name('CABINET'))
+        aep_parts: dict[tuple[str | None, ...], set[str]] = {}
+        for value in values:
+            aep_parts.setdefault(self._get_key(value[kksp_column], value[cabinet_column]), set()).add(
+                value[part_column])
+        self._aep_parts = {key: frozenset(parts) for key, parts in aep_parts.items()}
         sw_containers: dict[SWTemplate, dict[str, list[Signal]]] = {}
         for sw_template in self._options.sw_templates:
             sw_containers[sw_template] = {}
         for value in values:
-            ProgressBar.update_progress()
-            signal: Signal = Signal.create_from_row(value=value,
-                                                    base_type=self._connection.get_base_type())
+            if self._report_progress:
+                ProgressBar.update_progress()
+            signal: Signal = Signal.create_from_record(values=value,
+                                                       record_fields=record_fields)
 
             if signal.module in ['1623', '1631', '1661', '1662', '1671', '1673']:
                 self._process_wired_signal(signal=signal, sw_containers=sw_containers)
             elif signal.module == '1691':
                 self._process_digital_signal(signal=signal)
         self._flush_sw_container(sw_containers=sw_containers)
-        self._connection.commit()
+        self._flush_rows()
+
+    def _generate_tables_in_parallel(self, values_by_kksp: dict[str | None, list[tuple]], commit: bool) -> None:
+        """
+        Параллельная обработка KKSp в пуле процессов. Процессы получают копию справочных данных и строки таблицы
+        АЭП и возвращают подготовленные записи, которые выполняются основным процессом в порядке KKSp. Результат
+        совпадает с последовательной обработкой
+        :param values_by_kksp: Строки таблицы АЭП, сгруппированные по KKSp
+        :param commit: Фиксировать изменения после каждого KKSp (по политике транзакций)
+        :return: None
+        """
+        kksp_list: list[str | None] = list(values_by_kksp)
+        chunk_size: int = max(1, len(kksp_list) // (self._options.process_count * 4))
+        with ProcessPoolExecutor(max_workers=self._options.process_count,
+                                 initializer=_init_generate_tables_worker,
+                                 initargs=(self._options, self._connection.get_base_type(), self._columns_list,
+                                           self._areas, self._ip_addresses, self._fake_signals,
+                                           self._sw_schemas)) as executor:
+            results: Iterator[tuple[list[tuple[str, dict]], dict[str, set[str | None]]]] = executor.map(
+                _generate_table_for_kksp_in_worker, kksp_list, [values_by_kksp[kksp] for kksp in kksp_list],
+                chunksize=chunk_size)
+            try:
+                for kksp, (writes, missing_references) in zip(kksp_list, results):
+                    try:
+                        with self._connection.savepoint():
+                            for method_name, kwargs in writes:
+                                getattr(self._connection, method_name)(**kwargs)
+                    except Exception:
+                        logging.error(f'Ошибка обработки KKSp {kksp}, изменения KKSp отменены')
+                        raise
+                    if commit:
+                        self._connection.commit()
+                    for field_name, keys in missing_references.items():
+                        self._missing_references.setdefault(field_name, set()).update(keys)
+                    ProgressBar.update_progress_with_step(len(values_by_kksp.pop(kksp)))
+            except BaseException:
+                # Оставшиеся KKSp не обрабатываются
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    def _load_reference_tables(self) -> None:
+        """
+        Загрузка справочных данных для заполнения таблицы МЭК: областей (AREA) стоек, IP адресов терминалов и
+        списка фиктивных сигналов. Загрузка выполняется одним запросом на таблицу
+        :return: None
+        """
+        # Ключи приводятся к виду, в котором их сравнивает база, значения - к строкам, как в retrieve_data
+        self._areas = {}
+        for cabinet, area in self._connection.retrieve_data(table_name=self._options.controller_data_table_name,
+                                                            fields=['CABINET', 'AREA'],
+                                                            row_factory=RowFormat.TUPLE):
+            self._areas.setdefault(self._get_reference_key(cabinet)[0], self._get_key(area)[0])
+        self._ip_addresses = {}
+        for kksp, ip in self._connection.retrieve_data(table_name=self._options.network_data_table_name,
+                                                       fields=['KKSp', 'IP'],
+                                                       row_factory=RowFormat.TUPLE):
+            self._ip_addresses.setdefault(self._get_reference_key(kksp)[0], self._get_key(ip)[0])
+        self._fake_signals = {self._get_reference_key(kks, part) for kks, part in
+                              self._connection.retrieve_data(table_name=self._options.fake_signals_table_name,
+                                                             fields=['KKS', 'PART'],
+                                                             row_factory=RowFormat.TUPLE)}
+        self._sw_schemas = {}
+        if len(self._options.sw_templates) > 0:
+            for kks, part, cabinet, schema in self._connection.retrieve_data(table_name=self._options.ps_table_name,
+                                                                             fields=['KKS', 'PART', 'CABINET',
+                                                                                     'SCHEMA'],
+                                                                             row_factory=RowFormat.TUPLE):
+                self._sw_schemas.setdefault(self._get_reference_key(kks, part, cabinet), []).append(
+                    self._get_key(schema)[0])
+        self._missing_references = {}
+
+    @staticmethod
+    def _get_key(*values) -> tuple[str | None, ...]:
+        return tuple(None if value is None else str(value) for value in values)
+
+    def _get_reference_key(self, *values) -> tuple[str | None, ...]:
+        return self._connection.normalize_key(self._get_key(*values))
+
+    def _get_reference_value(self, references: dict[str | None, str | None], key: str | None,
+                             field_name: str) -> str | None:
+        """
+        Поиск значения в справочных данных. Ненайденные ключи запоминаются для вывода в конце работы
+        :param references: Справочные данные
+        :param key: Значение ключа
+        :param field_name: Имя искомого поля (для отчета)
+        :return: Найденное значение или None
+        """
+        reference_key: str | None = self._get_reference_key(key)[0]
+        if reference_key in references:
+            return references[reference_key]
+        self._missing_references.setdefault(field_name, set()).add(key)
+        return None
+
+    def _report_missing_references(self) -> None:
+        for field_name, keys in self._missing_references.items():
+            logging.error('Не найдено значение {0} для: {1}'.format(
+                field_name, ', '.join(sorted(str(key) for key in keys))))
 
     def _process_wired_signal(self, signal: Signal, sw_containers: dict[SWTemplate, dict[str, list[Signal]]]) -> None:
         """
@@ -337,13 +666,11 @@ class GenerateTables:
         :param part: Part, для которой ищется пара
         :return: Ответный part для развдоенного сигнала
         """
-        found_signal: DoublePointSignal = next((dps_signal for dps_signal in self._options.dps_signals if
-                                                dps_signal.on_part.casefold() == part.casefold()), None)
-        if found_signal is not None:
-            return found_signal.off_part
-        else:
-            return next(dps_signal.on_part for dps_signal in self._options.dps_signals
-                        if dps_signal.off_part.casefold() == part.casefold())
+        part_pair: str | None = self._options.dps_part_pairs.get(part.casefold())
+        if part_pair is None:
+            logging.error(f'Не найдена пара для PART {part}')
+            raise Exception('DPSPartNotFound')
+        return part_pair
 
     def _process_digital_signal(self, signal: Signal) -> None:
         """
@@ -351,10 +678,9 @@ class GenerateTables:
         :param signal: Сигнал (строка из базы)
         :return: None
         """
-        if signal.part in [dps_signal.single_part for dps_signal in self._options.dps_signals
-                           if dps_signal.single_part is not None] and \
-                not any(signal.kks.upper().startswith(item_kks.upper()) and signal.part.upper() == item_part.upper()
-                        for (item_kks, item_part) in self._options.skip_duplicate_signals):
+        skip_duplicate_prefixes: PrefixTrie | None = self._options.skip_duplicate_prefixes.get(signal.part.upper())
+        if signal.part in self._options.dps_single_parts and \
+                (skip_duplicate_prefixes is None or not skip_duplicate_prefixes.has_prefix_of(signal.kks.upper())):
             self._duplicate_signal(signal=signal)
         else:
             self._add_signal_to_iec_table(signal=signal)
@@ -466,30 +792,37 @@ class GenerateTables:
                 raise Exception('SignalGroupError')
 
     def _get_sw_template(self, kks: str, kksp: str, cabinet: str, sw_template: SWTemplate) -> tuple[str, str]:
-        values: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.aep_table_name,
-                                                                      fields=['PART'],
-                                                                      key_names=['KKSp', 'CABINET'],
-                                                                      key_values=[kksp, cabinet])
-        path_list: list[str] = [value[self.get_column_name('PART')] for value in values]
-        for sw_template in sorted(sw_template.variants, key=lambda item: len(item.parts), reverse=True):
-            if len(sw_template.parts) == 0 or all(part in path_list for part in sw_template.parts):
-                values: list[dict[str, str]] = self._connection.retrieve_data(table_name=self._options.ps_table_name,
-                                                                              fields=['SCHEMA'],
-                                                                              key_names=['KKS', 'PART', 'CABINET'],
-                                                                              key_values=[kks, sw_template.schema_part,
-                                                                                          cabinet])
-                if len(values) != 1:
-                    raise Exception('Ошибка получения схемы для SW')
-                if values[0][self.get_column_name('SCHEMA')] not in sw_template.schema:
-                    raise Exception('Ошибка получения схемы для SW')
-                return values[0][self.get_column_name('SCHEMA')], sw_template.schema_part
-        logging.error('Не найдена схема подключения для управления')
-        raise Exception('SWTemplateNotFound')
+        # Строки таблицы АЭП для KKSp и схемы из PREDEFINED_SCHEMAS загружены заранее
+        parts: frozenset[str] = self._aep_parts.get(self._get_key(kksp, cabinet), frozenset())
+        variant: SWTemplateVariant | None = self._get_sw_variant(sw_template=sw_template, parts=parts)
+        if variant is None:
+            logging.error('Не найдена схема подключения для управления')
+            raise Exception('SWTemplateNotFound')
+        schemas: list[str] = self._sw_schemas.get(self._get_reference_key(kks, variant.schema_part, cabinet), [])
+        if len(schemas) != 1:
+            raise Exception('Ошибка получения схемы для SW')
+        if schemas[0] not in variant.schema:
+            raise Exception('Ошибка получения схемы для SW')
+        return schemas[0], variant.schema_part
+
+    def _get_sw_variant(self, sw_template: SWTemplate, parts: frozenset[str]) -> SWTemplateVariant | None:
+        """
+        Выбор варианта подключения SW по набору PART стойки терминала: первый из вариантов с наибольшим числом
+        PART, все PART которого есть в наборе. Результат запоминается для одинаковых наборов
+        :param sw_template: Шаблон SW
+        :param parts: PART сигналов стойки терминала
+        :return: Вариант подключения или None
+        """
+        key: tuple[SWTemplate, frozenset[str]] = (sw_template, parts)
+        if key not in self._sw_variants:
+            self._sw_variants[key] = next(
+                (variant for variant in sorted(sw_template.variants, key=lambda item: len(item.parts), reverse=True)
+                 if len(variant.parts) == 0 or parts.issuperset(variant.parts)), None)
+        return self._sw_variants[key]
 
     def _modificate_signal(self, signal: Signal) -> Signal:
         signal_modification: SignalModification | None = \
-            next((item for item in self._options.signal_modifications
-                  if re.search(item.signal_kks, signal.kks) and re.search(item.signal_part, signal.part)), None)
+            self._options.signal_modification_matcher.find(kks=signal.kks, part=signal.part)
         if signal_modification is not None:
             if signal_modification.new_template is not None:
                 signal.template = signal_modification.new_template
@@ -529,17 +862,15 @@ class GenerateTables:
         columns, values = self._get_columns_and_values(signal=signal,
                                                        columns_from_table=self._columns_list[
                                                            self._options.sim_table_name])
-        self._connection.insert_row(table_name=self._options.sim_table_name,
-                                    column_names=columns,
-                                    values=values)
+        self._queue_row(table_name=self._options.sim_table_name,
+                        columns=columns,
+                        values=values)
 
     def _update_fake_signal_data(self, signal: Signal):
-        self._connection.update_field(table_name=self._options.fake_signals_table_name,
-                                      fields=['DESCR_RUS', 'DESCR_ENG', 'CABINET', 'KKSP', 'CatNam'],
-                                      values=[signal.name_rus, signal.name_eng,
-                                              signal.cabinet, signal.kksp, signal.cat_nam],
-                                      key_names=['KKS', 'PART'],
-                                      key_values=[signal.kks, signal.part])
+        # Изменения записываются пакетом в _flush_rows
+        self._fake_signal_updates.append(([signal.kks, signal.part],
+                                          [signal.name_rus, signal.name_eng, signal.cabinet, signal.kksp,
+                                           signal.cat_nam]))
 
     def _add_signal_to_iec_table(self, signal: Signal) -> None:
         """
@@ -548,28 +879,19 @@ class GenerateTables:
         :return: None
         """
         fake: bool = False
-        if (self._connection.contains_value(table_name=self._options.fake_signals_table_name,
-                                            key_names=['KKS', 'PART'],
-                                            key_values=[signal.kks, signal.part])):
+        if self._get_reference_key(signal.kks, signal.part) in self._fake_signals:
             self._update_fake_signal_data(signal=signal)
             fake = True
         digital_signal: DigitalSignal = DigitalSignal.create_from_signal(signal=signal)
-        digital_signal.area = self._connection.retrieve_data(
-            'TPTS', ['AREA'],
-            ['CABINET'],
-            [signal.cabinet])[0][self._connection.modify_column_name('AREA')]
-        digital_signal.ip = self._connection.retrieve_data(
-            self._options.network_data_table_name,
-            ['IP'], ['KKSp'],
-            [signal.kksp])[0][
-            self._connection.modify_column_name('IP')]
+        digital_signal.area = self._get_reference_value(references=self._areas, key=signal.cabinet, field_name='AREA')
+        digital_signal.ip = self._get_reference_value(references=self._ip_addresses, key=signal.kksp, field_name='IP')
         digital_signal.fake = fake
         columns, values = self._get_columns_and_values(signal=digital_signal,
                                                        columns_from_table=self._columns_list[
                                                            self._options.iec_table_name])
-        self._connection.insert_row(table_name=self._options.iec_table_name,
-                                    column_names=columns,
-                                    values=values)
+        self._queue_row(table_name=self._options.iec_table_name,
+                        columns=columns,
+                        values=values)
 
     @staticmethod
     def _sanitizate_signal_name(signal_name: str) -> str:
@@ -606,26 +928,25 @@ class GenerateTables:
             raise Exception('SignalNameCorrectionFailed')
         return out_string
 
-    def _read_signalization_table(self) -> None:
+    def _read_signalization_table(self, kksp_set: set[str | None] | None = None) -> None:
         """
-        Функция чтения строк таблицы DIAG и запись в таблицу СиМ
+        Функция копирования строк таблицы DIAG в таблицу СиМ (одним запросом INSERT INTO ... SELECT в базе)
+        :param kksp_set: KKSp, для которых записываются строки (None - все строки)
         :return: None
         """
-        values: list[dict[str, str]] = \
-            self._connection.retrieve_data(table_name=self._options.sign_table_name,
-                                           fields=self._columns_list[self._options.sign_table_name],
-                                           key_names=None,
-                                           key_values=None)
-        ProgressBar.config(max_value=len(values), length=50, step=1,
-                           prefix=f'Добавление диагностических сигналов', suffix='Завершено')
-        for value in values:
-            values_to_add: list[str] = []
-            for column in self._columns_list[self._options.sign_table_name]:
-                values_to_add.append(value[column])
-            self._connection.insert_row(table_name=self._options.sim_table_name,
-                                        column_names=self._columns_list[self._options.sign_table_name],
-                                        values=values_to_add)
-            ProgressBar.update_progress()
+        columns: list[str] = self._columns_list[self._options.sign_table_name]
+        kksp_column: str = self.get_column_name('KKSp')
+        if kksp_set is not None and kksp_column not in columns:
+            # Если в таблице DIAG нет столбца KKSp, строки записываются в таблицу СиМ с пустым KKSp
+            if None not in kksp_set:
+                return
+            kksp_set = None
+        added_rows: int = self._connection.copy_rows(table_name=self._options.sim_table_name,
+                                                     source_table_name=self._options.sign_table_name,
+                                                     column_names=columns,
+                                                     key_name=None if kksp_set is None else kksp_column,
+                                                     key_values=kksp_set)
+        logging.info(f'Добавлено диагностических сигналов: {added_rows}')
         self._connection.commit()
 
     def _get_table_columns(self):
@@ -656,33 +977,252 @@ class GenerateTables:
         Основная функция генерации таблиц
         :return: None
         """
-        logging.info(f'Очистка таблицы {self._options.sim_table_name}...')
-        self._connection.clear_table(self._options.sim_table_name)
-        logging.info('Завершено.')
-
-        logging.info(f'Очистка таблицы {self._options.iec_table_name}...')
-        self._connection.clear_table(self._options.iec_table_name)
+        if self._options.fingerprint_table_name is not None:
+            self._generate_incrementally()
+        else:
+            # Таблицы заполняются в промежуточных копиях и подменяются целиком после заполнения
+            with self._connection.staged_tables([self._options.sim_table_name, self._options.iec_table_name]):
+                self._get_table_columns()
+                self._load_reference_tables()
+                values_by_kksp: dict[str | None, list[tuple]] | None = \
+                    self._load_aep_table() if self._options.load_aep_table_once or self._options.process_count > 1 \
+                    else None
+                self._generate_kksp_groups(values_by_kksp=values_by_kksp)
+                self._read_signalization_table()
+        self._report_missing_references()
         logging.info('Завершено')
 
+    def _generate_kksp_groups(self, values_by_kksp: dict[str | None, list[tuple]] | None,
+                              commit: bool = True) -> None:
+        """
+        Заполнение таблиц по KKSp. При ошибке изменения KKSp отменяются откатом к точке сохранения, ошибка
+        передается вызывающей функции (этап завершается с ошибкой, таблицы не публикуются)
+        :param values_by_kksp: Строки таблицы АЭП, сгруппированные по KKSp. Если None, обрабатываются все KKSp
+        таблицы АЭП, строки загружаются отдельным запросом для каждого KKSp
+        :param commit: Фиксировать изменения после каждого KKSp (по политике транзакций). Если False, фиксацию
+        выполняет вызывающая функция
+        :return: None
+        """
+        if values_by_kksp is not None and len(values_by_kksp) == 0:
+            return
+        max_value: int = self._connection.get_row_count(self._options.aep_table_name) if values_by_kksp is None \
+            else sum(len(values) for values in values_by_kksp.values())
+        logging.info('Заполнение таблиц...')
+        ProgressBar.config(max_value=max_value, step=1, prefix='Обработка таблицы АЭП', suffix='Завершено',
+                           length=50)
+        if self._options.process_count > 1:
+            self._generate_tables_in_parallel(values_by_kksp=values_by_kksp, commit=commit)
+        else:
+            kksp_list: list[str | None] = self._get_kksp_list() if values_by_kksp is None else \
+                list(values_by_kksp)
+            for kksp in kksp_list:
+                try:
+                    with self._connection.savepoint():
+                        self._generate_table_for_kksp(kksp=kksp,
+                                                      values=None if values_by_kksp is None else
+                                                      values_by_kksp.pop(kksp))
+                except Exception:
+                    logging.error(f'Ошибка обработки KKSp {kksp}, изменения KKSp отменены')
+                    raise
+                if commit:
+                    self._connection.commit()
+
+    def _generate_incrementally(self) -> None:
+        """
+        Инкрементальное заполнение таблиц. Строки KKSp, отпечаток которых совпадает с сохраненным при прошлом
+        запуске, не изменяются, строки остальных KKSp (и KKSp, удаленных из таблицы АЭП) удаляются и формируются
+        заново. Если изменились все KKSp (первый запуск, изменение параметров или справочных данных), таблицы
+        перестраиваются полностью
+        :return: None
+        """
         self._get_table_columns()
+        kksp_column: str = self.get_column_name('KKSp')
+        for table_name in (self._options.sim_table_name, self._options.iec_table_name):
+            if kksp_column not in self._columns_list[table_name]:
+                logging.error(f'В таблице {table_name} нет столбца KKSp')
+                raise Exception('IncrementalGenerationNotSupported')
+        self._load_reference_tables()
+        values_by_kksp: dict[str | None, list[tuple]] = self._load_aep_table()
+        fingerprints: dict[str | None, str] = self._get_fingerprints(values_by_kksp=values_by_kksp)
+        stored_fingerprints: dict[str | None, str] = self._read_fingerprints()
+        changed_kksp: set[str | None] = {kksp for kksp, fingerprint in fingerprints.items()
+                                         if stored_fingerprints.get(kksp) != fingerprint}
+        removed_kksp: set[str | None] = {kksp for kksp in stored_fingerprints if kksp not in fingerprints}
+        if len(changed_kksp) == len(fingerprints):
+            logging.info('Изменены все KKSp, таблицы перестраиваются полностью')
+            with self._connection.staged_tables([self._options.sim_table_name, self._options.iec_table_name]):
+                self._generate_kksp_groups(values_by_kksp=values_by_kksp)
+                self._read_signalization_table()
+                self._write_fingerprints(fingerprints=fingerprints, removed_kksp=None)
+            return
 
-        max_value: int = self._connection.get_row_count(self._options.aep_table_name)
-        logging.info('Заполнение таблиц...')
-        ProgressBar.config(max_value=max_value, step=1, prefix='Обработка таблицы АЭП', suffix='Завершено', length=50)
-        kksp_list: list[str] = self._get_kksp_list()
-        for kksp in kksp_list:
-            self._generate_table_for_kksp(kksp=kksp)
-            self._connection.commit()
+        if self._connection.get_base_type() == BaseType.ACCESS:
+            # Access сравнивает строки без учета регистра: строки KKSp, отличающихся только регистром, удаляются
+            # вместе, поэтому и формируются заново вместе
+            affected_keys: set[str] = {kksp.upper() for kksp in changed_kksp | removed_kksp if kksp is not None}
+            changed_kksp.update(kksp for kksp in fingerprints if kksp is not None and kksp.upper() in affected_keys)
+        logging.info('KKSp без изменений: {0}, измененных: {1}, удаленных: {2}'.format(
+            len(fingerprints) - len(changed_kksp), len(changed_kksp), len(removed_kksp)))
+        affected_kksp: list[str | None] = [kksp for kksp in fingerprints if kksp in changed_kksp] + \
+                                          [kksp for kksp in stored_fingerprints if kksp in removed_kksp]
+        if len(affected_kksp) == 0:
+            return
+        # Строки затронутых KKSp удаляются и формируются заново в одной транзакции: при ошибке таблицы остаются
+        # в прежнем состоянии
+        try:
+            for table_name in (self._options.sim_table_name, self._options.iec_table_name):
+                self._connection.remove_rows(table_name=table_name,
+                                             key_names=['KKSp'],
+                                             rows=[[kksp] for kksp in affected_kksp])
+            if len(changed_kksp) > 0:
+                self._generate_kksp_groups(values_by_kksp={kksp: values for kksp, values in values_by_kksp.items()
+                                                           if kksp in changed_kksp},
+                                           commit=False)
+            # Строки DIAG удалены из таблицы СиМ вместе со строками KKSp
+            self._read_signalization_table(kksp_set=set(affected_kksp))
+        except BaseException:
+            self._connection.rollback()
+            raise
+        # Отпечатки сохраняются последними: при ошибке затронутые KKSp будут сформированы заново при следующем запуске
+        self._write_fingerprints(fingerprints={kksp: fingerprints[kksp] for kksp in affected_kksp
+                                               if kksp in changed_kksp},
+                                 removed_kksp=affected_kksp)
+        self._connection.commit()
 
-        self._read_signalization_table()
-        logging.info('Завершено')
+    def _get_fingerprints(self, values_by_kksp: dict[str | None, list[tuple]]) -> dict[str | None, str]:
+        """
+        Вычисление отпечатков KKSp: хэш SHA-256 строк таблицы АЭП для KKSp, параметров скрипта, справочных данных
+        и таблицы DIAG
+        :param values_by_kksp: Строки таблицы АЭП, сгруппированные по KKSp
+        :return: Словарь, где ключ - KKSp, значение - отпечаток
+        """
+        common_hash = hashlib.sha256()
+        for data in self._get_common_fingerprint_data():
+            common_hash.update(data.encode())
+        # Порядок столбцов в _columns_list зависит от запуска
+        columns: list[str] = self._columns_list[self._options.aep_table_name]
+        column_order: list[int] = sorted(range(len(columns)), key=lambda index: columns[index])
+        fingerprints: dict[str | None, str] = {}
+        for kksp, values in values_by_kksp.items():
+            kksp_hash = common_hash.copy()
+            for value in values:
+                kksp_hash.update(repr(tuple(value[index] for index in column_order)).encode())
+            fingerprints[kksp] = kksp_hash.hexdigest()
+        return fingerprints
+
+    def _get_common_fingerprint_data(self) -> Iterator[str]:
+        """
+        Данные, общие для отпечатков всех KKSp
+        :return: Итератор по строкам данных
+        """
+        options: dict[str, object] = {option.name: getattr(self._options, option.name)
+                                      for option in fields(self._options)
+                                      if option.init and option.name not in self.FINGERPRINT_EXCLUDED_OPTIONS}
+        yield json.dumps(options, default=self._get_json_value, sort_keys=True, ensure_ascii=False)
+        yield repr(sorted((table_name, sorted(columns)) for table_name, columns in self._columns_list.items()))
+        yield repr(sorted(self._areas.items(), key=repr))
+        yield repr(sorted(self._ip_addresses.items(), key=repr))
+        yield repr(sorted(self._fake_signals, key=repr))
+        yield repr(sorted(self._sw_schemas.items(), key=repr))
+        for value in self._connection.iter_data(table_name=self._options.sign_table_name,
+                                                fields=sorted(self._columns_list[self._options.sign_table_name]),
+                                                batch_size=10000,
+                                                row_factory=RowFormat.TUPLE):
+            yield repr(value)
+
+    @staticmethod
+    def _get_json_value(value: object) -> object:
+        if is_dataclass(value):
+            return asdict(value)
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        return repr(value)
+
+    def _read_fingerprints(self) -> dict[str | None, str]:
+        """
+        Чтение отпечатков KKSp, сохраненных при прошлом запуске. Таблица отпечатков создается, если ее нет в базе
+        :return: Словарь, где ключ - KKSp, значение - отпечаток
+        """
+        if self._connection.create_table(table_name=self._options.fingerprint_table_name,
+                                         column_names=['KKSp', 'FINGERPRINT']):
+            return {}
+        return dict(self._connection.retrieve_data(table_name=self._options.fingerprint_table_name,
+                                                   fields=['KKSp', 'FINGERPRINT'],
+                                                   row_factory=RowFormat.TUPLE))
+
+    def _write_fingerprints(self, fingerprints: dict[str | None, str], removed_kksp: list[str | None] | None) -> None:
+        """
+        Сохранение отпечатков KKSp
+        :param fingerprints: Новые отпечатки KKSp
+        :param removed_kksp: KKSp, отпечатки которых удаляются (None - удаляются все отпечатки)
+        :return: None
+        """
+        if removed_kksp is None:
+            self._connection.clear_table(table_name=self._options.fingerprint_table_name)
+        else:
+            self._connection.remove_rows(table_name=self._options.fingerprint_table_name,
+                                         key_names=['KKSp'],
+                                         rows=[[kksp] for kksp in removed_kksp])
+        self._connection.insert_rows(table_name=self._options.fingerprint_table_name,
+                                     column_names=['KKSp', 'FINGERPRINT'],
+                                     rows=[[kksp, fingerprint] for kksp, fingerprint in fingerprints.items()])
+
+    @staticmethod
+    def get_indexes(options: GenerateTableOptions) -> list[IndexDescription]:
+        """
+        Индексы, используемые при заполнении таблиц по KKSp
+        :param options: Параметры скрипта
+        :return: Список индексов
+        """
+        return [IndexDescription(table_name=options.aep_table_name, columns=['KKSp', 'CABINET']),
+                IndexDescription(table_name=options.ps_table_name, columns=['KKS', 'PART', 'CABINET']),
+                IndexDescription(table_name=options.fake_signals_table_name, columns=['KKS', 'PART'])]
 
     @staticmethod
     def run(options: GenerateTableOptions, connection: Connection) -> None:
         logging.info('Запуск скрипта "Заполнение таблиц"...')
         with connection:
+            connection.ensure_indexes(GenerateTables.get_indexes(options))
             generate_class: GenerateTables = GenerateTables(options=options,
                                                             connection=connection)
             generate_class.generate()
+            connection.log_query_statistics(stage_name='Заполнение таблиц')
         logging.info('Выпонение скрипта "Заполнение таблиц" завершено.')
         logging.info('')
+
+
+# Обработчик KKSp в процессе пула (см. GenerateTables._generate_tables_in_parallel)
+_worker_generate_tables: GenerateTables | None = None
+
+
+def _init_generate_tables_worker(options: GenerateTableOptions, base_type: BaseType,
+                                 columns_list: dict[str, list[str]],
+                                 areas: dict[str | None, str | None],
+                                 ip_addresses: dict[str | None, str | None],
+                                 fake_signals: set[tuple[str | None, str | None]],
+                                 sw_schemas: dict[tuple[str | None, ...], list[str]]) -> None:
+    global _worker_generate_tables
+    # Соединение не открывается и используется только для преобразования имен столбцов
+    connection: Connection = Connection('')
+    connection._base_type = base_type
+    _worker_generate_tables = GenerateTables(options=options, connection=connection)
+    _worker_generate_tables._columns_list = columns_list
+    _worker_generate_tables._areas = areas
+    _worker_generate_tables._ip_addresses = ip_addresses
+    _worker_generate_tables._fake_signals = fake_signals
+    _worker_generate_tables._sw_schemas = sw_schemas
+    _worker_generate_tables._report_progress = False
+
+
+def _generate_table_for_kksp_in_worker(kksp: str | None, values: list[tuple]) -> \
+        tuple[list[tuple[str, dict]], dict[str, set[str | None]]]:
+    _worker_generate_tables._deferred_writes = []
+    _worker_generate_tables._missing_references = {}
+    _worker_generate_tables._rows_to_insert = {}
+    _worker_generate_tables._fake_signal_updates = []
+    try:
+        _worker_generate_tables._generate_table_for_kksp(kksp=kksp, values=values)
+    except Exception as error:
+        # Исключение передается основному процессу, KKSp указывается в сообщении
+        raise Exception(f'Ошибка обработки KKSp {kksp}') from error
+    return _worker_generate_tables._deferred_writes, _worker_generate_tables._missing_references
@@ -1,9 +1,10 @@
-from tools.generate_tables import GenerateTableOptions, DoublePointSignal, SWTemplate, SignalModification, \
-    SWTemplateVariant
-from tools.fill_mms_address import FillMMSAddressOptions, DPCSignal, DatasetDescription, DatasetDescriptionList, \
-    BSCSignal, SignalRange
-from tools.fill_ref2 import FillRef2Options, InputPort, OutputPort, Template, TSODUPanel, TSODUData, TSODUDescription, \
-    TSODUTemplate
+from tools.generate_tables import GenerateTables, GenerateTableOptions, DoublePointSignal, SWTemplate, \
+    SignalModification, SWTemplateVariant
+from tools.fill_mms_address import FillMMSAdress, FillMMSAddressOptions, DPCSignal, DatasetDescription, \
+    DatasetDescriptionList, BSCSignal, SignalRange
+from tools.fill_ref2 import FillRef2, FillRef2Options, InputPort, OutputPort, Template, TSODUPanel, TSODUData, \
+    TSODUDescription, TSODUTemplate
+from tools.utils.sql_utils import IndexDescription
 from dataclasses import dataclass
 
 
@@ -13,6 +14,47 @@ class Options:
     fill_mms_address_options: FillMMSAddressOptions
     fill_ref2_options: FillRef2Options
 
+    def get_snapshot_tables(self) -> list[str]:
+        """
+        Имена таблиц, с которыми работают скрипты (для Connection.export_snapshot)
+        :return: Список имен таблиц
+        """
+        generate_options: GenerateTableOptions = self.generate_table_options
+        fill_mms_options: FillMMSAddressOptions = self.fill_mms_address_options
+        fill_ref2_options: FillRef2Options = self.fill_ref2_options
+        table_names: list[str] = [generate_options.network_data_table_name,
+                                  generate_options.controller_data_table_name,
+                                  generate_options.aep_table_name,
+                                  generate_options.sim_table_name,
+                                  generate_options.iec_table_name,
+                                  generate_options.ied_table_name,
+                                  generate_options.ref_table_name,
+                                  generate_options.sign_table_name,
+                                  generate_options.ps_table_name,
+                                  generate_options.fake_signals_table_name,
+                                  fill_mms_options.iec_table_name,
+                                  fill_mms_options.ied_table_name,
+                                  fill_mms_options.mms_table_name,
+                                  fill_ref2_options.control_schemas_table,
+                                  fill_ref2_options.predifend_control_schemas_table,
+                                  fill_ref2_options.ts_odu_algorithm,
+                                  fill_ref2_options.ts_odu_table,
+                                  fill_ref2_options.ref_table,
+                                  fill_ref2_options.sim_table,
+                                  fill_ref2_options.iec_table,
+                                  fill_ref2_options.fake_signals_table,
+                                  fill_ref2_options.abonent_table]
+        return list(dict.fromkeys(table_names))
+
+    def get_snapshot_indexes(self) -> list[IndexDescription]:
+        """
+        Индексы, используемые скриптами (для Connection.export_snapshot)
+        :return: Список индексов
+        """
+        return (GenerateTables.get_indexes(self.generate_table_options) +
+                FillMMSAdress.get_indexes(self.fill_mms_address_options) +
+                FillRef2.get_indexes(self.fill_ref2_options))
+
     @staticmethod
     def load_ruppur() -> 'Options':
         # <-------------------------------generate_table_options------------------------------------------------------->
@@ -24,8 +24,10 @@ class ProgressBar:
 
     @staticmethod
     def draw_progress(value: float):
-        percent = ("{0:." + str(ProgressBar.decimals) + "f}").format(100 * (value / ProgressBar.max_value))
-        filled_length = int(ProgressBar.length * value // ProgressBar.max_value)
+        # Пустой набор данных отображается как завершенный
+        fraction = value / ProgressBar.max_value if ProgressBar.max_value > 0 else 1
+        percent = ("{0:." + str(ProgressBar.decimals) + "f}").format(100 * fraction)
+        filled_length = min(int(ProgressBar.length * fraction), ProgressBar.length)
         bar = ProgressBar.fill * filled_length + '-' * (ProgressBar.length - filled_length)
         print(f'\r{ProgressBar.prefix} |{bar}| {percent}% {ProgressBar.suffix}', end='', flush=True)
         ProgressBar.current_value = value
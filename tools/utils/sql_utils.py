@@ -1,89 +1,1004 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import shutil
+import sqlite3
+import threading
+import time
 import pyodbc
 import psycopg
+from collections import OrderedDict, namedtuple
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field, fields
 from enum import IntEnum
+from typing import ClassVar
+
+
+# Логические поля хранятся в SQLite как 0/1 и читаются как bool (для совпадения с Access и Postgres)
+sqlite3.register_converter('BOOLEAN', lambda value: value == b'1')
 
 
 class BaseType(IntEnum):
     ACCESS = 0
     POSTGRES = 1
+    SQLITE = 2
+
+
+class RowFormat(IntEnum):
+    # Словарь {имя столбца: значение, приведенное к str}
+    DICT = 0
+    # Кортеж значений в порядке полей запроса с исходными типами
+    TUPLE = 1
+    # namedtuple с именами столбцов (после modify_column_name) и исходными типами
+    NAMED_TUPLE = 2
+
+
+class TransactionPolicy(IntEnum):
+    # Фиксация при каждом вызове commit
+    IMMEDIATE = 0
+    # Фиксация при вызове commit, если с последней фиксации записано не менее commit_rows строк
+    ROWS = 1
+    # Фиксация при вызове commit, если с последней фиксации прошло не менее commit_interval секунд
+    INTERVAL = 2
+    # Фиксация один раз при закрытии соединения (этап выполняется в одной транзакции)
+    STAGE = 3
+
+
+class IndexType(IntEnum):
+    # Обычный индекс для сравнения на равенство
+    BTREE = 0
+    # Индекс для LIKE с фиксированным началом шаблона (text_pattern_ops, только Postgres)
+    PATTERN = 1
+    # Триграммный индекс для LIKE с произвольным шаблоном (pg_trgm, только Postgres)
+    TRIGRAM = 2
+
+
+@dataclass(init=True, repr=False, eq=False, order=False, frozen=True)
+class IndexDescription:
+    """
+    Описание индекса, необходимого этапу для поиска по таблице
+    """
+    table_name: str
+    columns: list[str]
+    index_type: IndexType = IndexType.BTREE
+
+
+@dataclass(init=True, repr=False, eq=False, order=False)
+class QueryStatistics:
+    # Число сохраняемых значений времени выполнения (равномерная выборка, по которой считаются процентили)
+    SAMPLE_SIZE: ClassVar[int] = 1000
+
+    count: int = 0
+    total_time: float = 0
+    max_time: float = 0
+    rows: int = 0
+    durations: list[float] = field(default_factory=list)
+
+    def add(self, elapsed_time: float) -> None:
+        self.count += 1
+        self.total_time += elapsed_time
+        self.max_time = max(self.max_time, elapsed_time)
+        if len(self.durations) < self.SAMPLE_SIZE:
+            self.durations.append(elapsed_time)
+        else:
+            index: int = random.randrange(self.count)
+            if index < self.SAMPLE_SIZE:
+                self.durations[index] = elapsed_time
+
+    def get_percentile(self, percentile: float) -> float:
+        """
+        Процентиль времени выполнения (по выборке из не более чем SAMPLE_SIZE значений)
+        :param percentile: Процентиль, %
+        :return: Время, с
+        """
+        durations: list[float] = sorted(self.durations)
+        return durations[min(len(durations) - 1, int(len(durations) * percentile / 100))]
+
+
+class PendingResult:
+    """
+    Результат запроса, отправленного через Connection.pipeline(). Строки загружаются при первом обращении
+    к result() (для Postgres это вызывает синхронизацию конвейера)
+    """
+    _cursor: psycopg.Cursor | None
+    _fields: list[str] | None
+    _rows: list[dict[str, str]] | None
+    _on_result: Callable[[list[dict[str, str]]], None] | None
+
+    def __init__(self, cursor: psycopg.Cursor | None = None, fields: list[str] | None = None,
+                 rows: list[dict[str, str]] | None = None,
+                 on_result: Callable[[list[dict[str, str]]], None] | None = None):
+        self._cursor = cursor
+        self._fields = fields
+        self._rows = rows
+        self._on_result = on_result
+
+    def done(self) -> bool:
+        return self._rows is not None
+
+    def result(self) -> list[dict[str, str]]:
+        if self._rows is None:
+            if self._cursor is None:
+                raise Exception("Запрос конвейера был прерван")
+            try:
+                self._rows = Connection._convert_rows(rows=self._cursor.fetchall(), fields=self._fields)
+            finally:
+                self.close()
+            if self._on_result is not None:
+                self._on_result(self._rows)
+        return self._rows
+
+    def close(self) -> None:
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+
+class QueryPipeline:
+    """
+    Набор независимых запросов, выполняемых в режиме конвейера. Создается через Connection.pipeline()
+    """
+    _connection: 'Connection'
+    _pipelined: bool
+    _results: list[PendingResult]
+
+    def __init__(self, connection: 'Connection', pipelined: bool):
+        self._connection = connection
+        self._pipelined = pipelined
+        self._results = []
+
+    def retrieve_data(self, table_name: str, fields: list[str],
+                      key_names: list[str] | None = None,
+                      key_values: list[str | int | bool | None] | None = None,
+                      uniq_values: bool = False,
+                      sort_by: list[str] | None = None,
+                      key_operator: list[str] | None = None) -> PendingResult:
+        """
+        Отправка запроса SELECT без ожидания ответа. Параметры совпадают с Connection.retrieve_data
+        :return: Отложенный результат запроса
+        """
+        if not self._pipelined:
+            return PendingResult(rows=self._connection.retrieve_data(table_name=table_name,
+                                                                     fields=fields,
+                                                                     key_names=key_names,
+                                                                     key_values=key_values,
+                                                                     uniq_values=uniq_values,
+                                                                     sort_by=sort_by,
+                                                                     key_operator=key_operator))
+        result: PendingResult = self._connection._submit_select(table_name=table_name,
+                                                                fields=fields,
+                                                                key_names=key_names,
+                                                                key_values=key_values,
+                                                                uniq_values=uniq_values,
+                                                                sort_by=sort_by,
+                                                                key_operator=key_operator)
+        self._results.append(result)
+        return result
+
+    def fetch_all(self) -> None:
+        for result in self._results:
+            result.result()
+
+    def close(self) -> None:
+        for result in self._results:
+            result.close()
+
+
+class SchemaRegistry:
+    """
+    Соответствие логических имен таблиц и столбцов (имена в Access) физическим именам в базе.
+    Имена вычисляются один раз и дальше берутся из словарей
+    """
+    _base_type: BaseType
+    _table_names: dict[str, str]
+    _column_names: dict[str, str]
+    _logical_column_names: dict[str, str]
+    # Тип класса -> список (имя поля, логическое имя столбца, физическое имя столбца)
+    _dataclass_columns: dict[type, list[tuple[str, str, str]]]
+
+    # Имена таблиц в Postgres и SQLite, отличающиеся от имени в нижнем регистре
+    TABLE_NAMES: dict[str, str] = {'Логика ТС ОДУ': 'ts_odu_logic',
+                                   'Модули связи с процессом': 'process_modules',
+                                   'МЭК 61850': 'iec_61850',
+                                   'Периферийное оборудование': 'extern_devices',
+                                   'Сигналы и механизмы': 'signals_and_mechanisms',
+                                   'Сигналы и механизмы АЭП': 'signals_and_mechanisms_aep',
+                                   'Сигналы и механизмы ТС ОДУ': 'ts_odu_signals_and_mechanisms',
+                                   'REF': 'refs'}
+    # Имена столбцов в Postgres и SQLite, отличающиеся от имени в нижнем регистре (зарезервированные слова)
+    COLUMN_NAMES: dict[str, str] = {'REF': 'refer',
+                                    'ТАБЛО': 'indicator_name',
+                                    'TYPE': 'type_name',
+                                    'SCHEMA': 'schema_name',
+                                    'COMMENT': 'comm',
+                                    'GROUP': 'group_name',
+                                    'MODULE': 'module_name',
+                                    'SET': 'set_val',
+                                    'CONNECTION': 'conn'}
+
+    def __init__(self, base_type: BaseType):
+        if base_type not in (BaseType.ACCESS, BaseType.POSTGRES, BaseType.SQLITE):
+            raise Exception("Неподдерживаемый тип DBEngine")
+        self._base_type = base_type
+        self._table_names = {}
+        self._column_names = {}
+        self._logical_column_names = {}
+        self._dataclass_columns = {}
+        if base_type != BaseType.ACCESS:
+            self._table_names.update(self.TABLE_NAMES)
+            self._column_names.update(self.COLUMN_NAMES)
+            self._logical_column_names.update({value: key for key, value in self.COLUMN_NAMES.items()})
+
+    def get_table_name(self, table_name: str) -> str:
+        """
+        Физическое имя таблицы
+        :param table_name: Логическое имя таблицы
+        :return: Имя таблицы для подстановки в запрос
+        """
+        physical_name: str | None = self._table_names.get(table_name)
+        if physical_name is None:
+            if self._base_type == BaseType.ACCESS:
+                physical_name = f'[{table_name}]'
+            else:
+                physical_name = table_name.lower().replace(' ', '_')
+            self._table_names[table_name] = physical_name
+        return physical_name
+
+    def get_column_name(self, column: str) -> str:
+        """
+        Физическое имя столбца
+        :param column: Логическое имя столбца
+        :return: Имя столбца в базе
+        """
+        physical_name: str | None = self._column_names.get(column)
+        if physical_name is None:
+            physical_name = column if self._base_type == BaseType.ACCESS else column.lower()
+            self._column_names[column] = physical_name
+            self._logical_column_names.setdefault(physical_name, column)
+        return physical_name
+
+    def get_logical_column_name(self, column: str) -> str:
+        """
+        Логическое имя столбца по имени столбца в строке результата. Для столбцов, имена которых ранее не
+        преобразовывались, возвращается исходное имя
+        :param column: Имя столбца в базе
+        :return: Логическое имя столбца
+        """
+        return self._logical_column_names.get(column, column)
+
+    def get_logical_row(self, row: dict[str, object]) -> dict[str, object]:
+        """
+        Преобразование строки результата к логическим именам столбцов
+        :param row: Строка в формате RowFormat.DICT
+        :return: Строка с логическими именами столбцов
+        """
+        return {self.get_logical_column_name(key): value for key, value in row.items()}
+
+    def get_dataclass_columns(self, dataclass_type: type) -> list[tuple[str, str, str]]:
+        """
+        Столбцы для полей класса, у которых в metadata задан column_name
+        :param dataclass_type: Класс (dataclass)
+        :return: Список из имени поля, логического и физического имени столбца
+        """
+        columns: list[tuple[str, str, str]] | None = self._dataclass_columns.get(dataclass_type)
+        if columns is None:
+            columns = [(dataclass_field.name, dataclass_field.metadata['column_name'],
+                        self.get_column_name(dataclass_field.metadata['column_name']))
+                       for dataclass_field in fields(dataclass_type) if 'column_name' in dataclass_field.metadata]
+            self._dataclass_columns[dataclass_type] = columns
+        return columns
 
 
 class Connection:
-    _connection: pyodbc.Connection | psycopg.Connection
-    _cursor: pyodbc.Cursor | psycopg.Cursor
+    _connection: pyodbc.Connection | psycopg.Connection | sqlite3.Connection
+    _cursor: pyodbc.Cursor | psycopg.Cursor | sqlite3.Cursor
     _connection_string: str
     _base_type: BaseType
+    _stream_cursor_index: int
+    _query_cache: dict[tuple, tuple | str]
+    _query_cache_hits: int
+    _query_cache_misses: int
+    _query_statistics: dict[str, QueryStatistics]
+    _last_statistics: QueryStatistics | None
+    _row_types: dict[tuple[str, ...], type]
+    _result_cache: OrderedDict[tuple, list] | None
+    _result_cache_tables: set[str] | None
+    _result_cache_keys: dict[str, set[tuple]]
+    _result_cache_rows: int
+    _result_cache_max_rows: int
+    _result_cache_hits: int
+    _result_cache_misses: int
+    # Имя таблицы -> (имя промежуточной таблицы, имя исходной таблицы в базе)
+    _staged_tables: dict[str, tuple[str, str]]
+    _schema_registry: SchemaRegistry | None
+    _read_only: bool
+    _transaction_policy: TransactionPolicy
+    _commit_rows: int
+    _commit_interval: float
+    _uncommitted_rows: int
+    _last_commit_time: float
+    _pending_commit: bool
+    _savepoint_index: int
+
+    # Размер пакета для executemany (Access)
+    INSERT_BATCH_SIZE: int = 1000
+    # Размер пакета для COPY (Postgres)
+    COPY_BATCH_SIZE: int = 10000
+    # Число ключей в одном запросе retrieve_data_many
+    ACCESS_KEYS_BATCH_SIZE: int = 50
+    SQLITE_KEYS_BATCH_SIZE: int = 500
+    POSTGRES_KEYS_BATCH_SIZE: int = 10000
+    # Время выполнения (с), начиная с которого запрос и его параметры записываются в лог. None - не записывать
+    SLOW_QUERY_THRESHOLD: float | None = 1.0
+    # Число запросов в отчете log_query_statistics
+    QUERY_REPORT_SIZE: int = 20
+    # Число пробных запросов для оценки ускорения в ensure_indexes
+    INDEX_SAMPLE_SIZE: int = 20
+    # Размер отображаемой в память части файла snapshot (байт)
+    SNAPSHOT_MMAP_SIZE: int = 1 << 30
 
     def __init__(self, connection_string: str):
         self._connection_string: str = connection_string
+        self._stream_cursor_index = 0
+        self._query_cache = {}
+        self._query_cache_hits = 0
+        self._query_cache_misses = 0
+        self._query_statistics = {}
+        self._last_statistics = None
+        self._row_types = {}
+        self._result_cache = None
+        self._result_cache_tables = None
+        self._result_cache_keys = {}
+        self._result_cache_rows = 0
+        self._result_cache_max_rows = 0
+        self._result_cache_hits = 0
+        self._result_cache_misses = 0
+        self._staged_tables = {}
+        self._schema_registry = None
+        self._read_only = False
+        self._transaction_policy = TransactionPolicy.IMMEDIATE
+        self._commit_rows = 0
+        self._commit_interval = 0
+        self._reset_transaction_state()
 
     def __enter__(self):
+        self.reset_query_statistics()
+        self._reset_transaction_state()
         if self._base_type == BaseType.ACCESS:
             self._connection = pyodbc.connect(self._connection_string)
             self._cursor = self._connection.cursor()
         elif self._base_type == BaseType.POSTGRES:
             self._connection = psycopg.connect(self._connection_string)
             self._cursor = self._connection.cursor()
+        elif self._base_type == BaseType.SQLITE:
+            if self._read_only:
+                self._connection = sqlite3.connect(f'file:{self._connection_string}?mode=ro', uri=True,
+                                                   detect_types=sqlite3.PARSE_DECLTYPES)
+            else:
+                self._connection = sqlite3.connect(self._connection_string, detect_types=sqlite3.PARSE_DECLTYPES)
+            self._cursor = self._connection.cursor()
+            # LIKE в Postgres учитывает регистр
+            self._execute('PRAGMA case_sensitive_like = ON')
+            if self._read_only:
+                # Чтение страниц файла через отображение в память, без копирования в кэш SQLite
+                self._execute(f'PRAGMA mmap_size = {self.SNAPSHOT_MMAP_SIZE}')
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        logging.debug('Кэш запросов: попаданий {0}, промахов {1}'.format(*self.get_query_cache_statistics()))
+        # Отложенные изменения фиксируются только при выходе без ошибки, при ошибке все незафиксированные
+        # изменения отменяются
+        if exc_type is not None:
+            self.rollback()
+        elif self._pending_commit:
+            self._commit()
+        self.disable_result_cache()
         self._cursor.close()
         self._connection.close()
 
+    def is_alive(self) -> bool:
+        """
+        Проверка работоспособности открытого соединения
+        :return: True, если соединение открыто и сервер отвечает на запросы
+        """
+        try:
+            if self._base_type == BaseType.ACCESS:
+                self._cursor.tables(tableType='TABLE').fetchone()
+            elif self._base_type == BaseType.POSTGRES:
+                if self._connection.closed or self._connection.broken:
+                    return False
+                self._execute('SELECT 1')
+                self._cursor.fetchall()
+            elif self._base_type == BaseType.SQLITE:
+                self._execute('SELECT 1')
+                self._cursor.fetchall()
+            else:
+                raise Exception("Неподдерживаемый тип DBEngine")
+        except (pyodbc.Error, psycopg.Error, sqlite3.Error):
+            return False
+        return True
+
+    def create_pool(self, max_size: int = 4) -> 'ConnectionPool':
+        """
+        Создание пула соединений с теми же параметрами подключения
+        :param max_size: Максимальное число одновременно открытых соединений
+        :return: Пул соединений
+        """
+        return ConnectionPool(connection_string=self._connection_string,
+                              base_type=self._base_type,
+                              max_size=max_size)
+
+    def create_async_connection(self, max_connections: int = 4) -> 'AsyncConnection':
+        """
+        Создание асинхронного соединения с теми же параметрами подключения (только Postgres)
+        :param max_connections: Число соединений, на которых одновременно выполняются запросы
+        :return: Асинхронное соединение
+        """
+        return AsyncConnection(connection_string=self._connection_string,
+                               base_type=self._base_type,
+                               max_connections=max_connections)
+
     def retrieve_data(self, table_name: str, fields: list[str],
                       key_names: list[str] | None = None,
                       key_values: list[str | int | bool | None] | None = None,
                       uniq_values: bool = False,
                       sort_by: list[str] | None = None,
-                      key_operator: list[str] | None = None) -> list[dict[str, str]]:
+                      key_operator: list[str] | None = None,
+                      row_factory: RowFormat | type = RowFormat.DICT) -> list:
+        """
+        Загрузка строк таблицы
+        :param row_factory: Формат строк результата: RowFormat или класс, создаваемый из значений строки
+        в порядке fields (например, dataclass со slots). Для всех форматов, кроме RowFormat.DICT, значения
+        не приводятся к str
+        :return: Список строк (по умолчанию - словари {имя столбца: значение})
+        """
+        query, key_values_for_query, fields = self._build_select_query(table_name=table_name,
+                                                                       fields=fields,
+                                                                       key_names=key_names,
+                                                                       key_values=key_values,
+                                                                       uniq_values=uniq_values,
+                                                                       sort_by=sort_by,
+                                                                       key_operator=key_operator)
+        result_cache_key: tuple | None = self._get_result_cache_key(table_name=table_name,
+                                                                    query=query,
+                                                                    params=key_values_for_query,
+                                                                    row_factory=row_factory)
+        if result_cache_key is not None:
+            cached_rows: list | None = self._get_cached_result(result_cache_key)
+            if cached_rows is not None:
+                return cached_rows
+        self._execute(query, key_values_for_query, prepare=True)
+        rows: list = self._make_rows(rows=self._fetchall(), fields=fields, row_factory=row_factory)
+        if result_cache_key is not None:
+            self._put_cached_result(result_cache_key, rows)
+        return rows
+
+    def enable_result_cache(self, table_names: list[str] | None = None, max_rows: int = 1000000) -> None:
+        """
+        Включение кэша результатов retrieve_data для таблиц, которые не изменяются другими клиентами во время
+        работы. Записи таблицы удаляются из кэша при изменении таблицы через это соединение (insert_row,
+        insert_rows, update_field, update_fields_bulk, remove_row, clear_table). При превышении max_rows
+        удаляются давно не использовавшиеся записи. Строки-словари (RowFormat.DICT) копируются при записи в кэш и
+        при выдаче из кэша, строки других форматов (в т.ч. объекты row_factory) выдаются без копирования и
+        не должны изменяться вызывающим кодом
+        :param table_names: Кэшируемые таблицы (None - все таблицы)
+        :param max_rows: Максимальное суммарное число строк в кэше
+        :return: None
+        """
+        self._result_cache = OrderedDict()
+        self._result_cache_tables = None if table_names is None else \
+            {self.modify_table_name(table_name) for table_name in table_names}
+        self._result_cache_keys = {}
+        self._result_cache_rows = 0
+        self._result_cache_max_rows = max_rows
+
+    def disable_result_cache(self) -> None:
+        self._result_cache = None
+        self._result_cache_tables = None
+        self._result_cache_keys = {}
+        self._result_cache_rows = 0
+
+    def get_result_cache_statistics(self) -> tuple[int, int]:
+        """
+        Статистика кэша результатов
+        :return: Кортеж из числа попаданий и числа промахов
+        """
+        return self._result_cache_hits, self._result_cache_misses
+
+    def _get_result_cache_key(self, table_name: str, query: str, params: list | None,
+                              row_factory: RowFormat | type) -> tuple | None:
+        if self._result_cache is None:
+            return None
+        table_name = self.modify_table_name(table_name)
+        if self._result_cache_tables is not None and table_name not in self._result_cache_tables:
+            return None
+        return table_name, query, None if params is None else tuple(params), row_factory
+
+    def _get_cached_result(self, result_cache_key: tuple) -> list | None:
+        rows: list | None = self._result_cache.get(result_cache_key)
+        if rows is None:
+            self._result_cache_misses += 1
+            return None
+        self._result_cache_hits += 1
+        self._result_cache.move_to_end(result_cache_key)
+        # Вызывающий код может дополнять полученный список и изменять строки-словари
+        return self._copy_cached_rows(result_cache_key, rows)
+
+    def _put_cached_result(self, result_cache_key: tuple, rows: list) -> None:
+        if self._result_cache is None or len(rows) > self._result_cache_max_rows:
+            return
+        # Повторная запись ключа (одинаковые запросы в конвейере) заменяет запись без двойного учета строк
+        old_rows: list | None = self._result_cache.pop(result_cache_key, None)
+        if old_rows is not None:
+            self._result_cache_rows -= len(old_rows)
+        self._result_cache[result_cache_key] = self._copy_cached_rows(result_cache_key, rows)
+        self._result_cache_keys.setdefault(result_cache_key[0], set()).add(result_cache_key)
+        self._result_cache_rows += len(rows)
+        while self._result_cache_rows > self._result_cache_max_rows:
+            old_key, old_rows = self._result_cache.popitem(last=False)
+            self._result_cache_keys[old_key[0]].discard(old_key)
+            self._result_cache_rows -= len(old_rows)
+
+    @staticmethod
+    def _copy_cached_rows(result_cache_key: tuple, rows: list) -> list:
+        if result_cache_key[3] == RowFormat.DICT:
+            return [dict(row) for row in rows]
+        return list(rows)
+
+    def _invalidate_result_cache(self, table_name: str) -> None:
+        """
+        Удаление из кэша результатов записей измененной таблицы
+        :param table_name: Имя таблицы (до преобразования)
+        :return: None
+        """
+        if self._result_cache is None:
+            return
+        for result_cache_key in self._result_cache_keys.pop(self.modify_table_name(table_name), set()):
+            self._result_cache_rows -= len(self._result_cache.pop(result_cache_key))
+
+    def retrieve_data_many(self, table_name: str, fields: list[str],
+                           key_names: list[str],
+                           key_values_list: Iterable[list[str | int | bool | None] | tuple],
+                           uniq_values: bool = False) -> dict[tuple[str | None, ...], list[dict[str, str]]]:
+        """
+        Пакетный поиск строк по набору ключей за минимальное число запросов. Для Postgres используется
+        = ANY(%s) (один ключ) или соединение с VALUES (несколько ключей), для Access - пакеты условий IN/OR
+        :param table_name: Имя таблицы
+        :param fields: Загружаемые поля
+        :param key_names: Имена ключевых полей
+        :param key_values_list: Список наборов значений ключевых полей
+        :param uniq_values: Только уникальные значения
+        :return: Словарь, где ключ - кортеж значений ключевых полей (приведенных к str), значение - строки
+        в формате retrieve_data
+        """
+        result: dict[tuple[str | None, ...], list[dict[str, str]]] = {}
+        keys_by_normalized_key: dict[tuple[str, ...], list[tuple[str, ...]]] = {}
+        # Значения ключа передаются в запрос в исходном виде (для столбцов нетекстовых типов в Postgres),
+        # приведенные к str значения используются только как ключ результата
+        query_values: dict[tuple[str, ...], tuple] = {}
+        for key_values in key_values_list:
+            if len(key_values) != len(key_names):
+                print('Несоответствие названий ключевых полей и их значений')
+                raise Exception("AccessError")
+            key: tuple[str | None, ...] = tuple(None if value is None else str(value) for value in key_values)
+            if key in result:
+                continue
+            result[key] = []
+            if any(value is None for value in key):
+                # Сравнение с NULL выполняется через IS NULL, поэтому такие ключи загружаются отдельно
+                result[key] = self.retrieve_data(table_name=table_name,
+                                                 fields=fields,
+                                                 key_names=key_names,
+                                                 key_values=list(key_values),
+                                                 uniq_values=uniq_values)
+                continue
+            query_values[key] = tuple(key_values)
+            keys_by_normalized_key.setdefault(self.normalize_key(key), []).append(key)
+        if len(keys_by_normalized_key) == 0:
+            return result
+
         table_name = self.modify_table_name(table_name)
         fields = self.modify_column_names(fields)
         key_names = self.modify_column_names(key_names)
-        sort_by = self.modify_column_names(sort_by)
-
+        select_fields: list[str] = fields + [key_name for key_name in key_names if key_name not in fields]
         distinct_placeholder: str = ' DISTINCT ' if uniq_values else ''
-        sort_by_placeholder: str = ' ORDER BY ' + ' ,'.join(sort_by) + ' ASC' if sort_by is not None else ''
+
+        keys: list[tuple[str, ...]] = [keys[0] for keys in keys_by_normalized_key.values()]
+        if self._base_type in (BaseType.ACCESS, BaseType.SQLITE):
+            keys_batch_size: int = self.ACCESS_KEYS_BATCH_SIZE if self._base_type == BaseType.ACCESS \
+                else self.SQLITE_KEYS_BATCH_SIZE
+            for batch in self._split_to_batches(keys, keys_batch_size):
+                if len(key_names) == 1:
+                    condition_placeholder: str = '{0} IN ({1})'.format(key_names[0], ','.join(['?'] * len(batch)))
+                else:
+                    condition_placeholder: str = ' OR '.join(
+                        ['(' + ' AND '.join(['{0} = ?'.format(key_name) for key_name in key_names]) + ')'] *
+                        len(batch))
+                query: str = 'SELECT {0}{1} FROM {2} WHERE {3}'.format(distinct_placeholder, ', '.join(select_fields),
+                                                                       table_name, condition_placeholder)
+                self._execute(query, [value for key in batch for value in query_values[key]])
+                self._group_rows(rows=self._convert_rows(rows=self._fetchall(), fields=select_fields),
+                                 fields=fields, key_names=key_names, keys_by_normalized_key=keys_by_normalized_key,
+                                 result=result)
+        elif self._base_type == BaseType.POSTGRES:
+            for batch in self._split_to_batches(keys, self.POSTGRES_KEYS_BATCH_SIZE):
+                if len(key_names) == 1:
+                    query: str = 'SELECT {0}{1} FROM {2} WHERE {3} = ANY(%s)'.format(
+                        distinct_placeholder, ', '.join(select_fields), table_name, key_names[0])
+                    params: list = [[query_values[key][0] for key in batch]]
+                else:
+                    values_placeholder: str = ','.join(['(' + ','.join(['%s'] * len(key_names)) + ')'] * len(batch))
+                    join_placeholder: str = ' AND '.join(['t.{0} = v.key_{1}'.format(key_name, index)
+                                                          for index, key_name in enumerate(key_names)])
+                    query: str = 'SELECT {0}{1} FROM {2} t INNER JOIN (VALUES {3}) AS v ({4}) ON {5}'.format(
+                        distinct_placeholder, ', '.join(['t.' + field for field in select_fields]), table_name,
+                        values_placeholder, ', '.join(['key_{0}'.format(index) for index in range(len(key_names))]),
+                        join_placeholder)
+                    params: list = [value for key in batch for value in query_values[key]]
+                self._execute(query, params)
+                self._group_rows(rows=self._convert_rows(rows=self._fetchall(), fields=select_fields),
+                                 fields=fields, key_names=key_names, keys_by_normalized_key=keys_by_normalized_key,
+                                 result=result)
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        return result
+
+    @contextmanager
+    def pipeline(self) -> Iterator[QueryPipeline]:
+        """
+        Конвейерное выполнение независимых запросов: для Postgres запросы отправляются на сервер в режиме
+        pipeline без ожидания ответа на каждый из них, результаты загружаются при выходе из блока with
+        (или раньше, при обращении к результату). Для Access и libpq без поддержки конвейера запросы
+        выполняются сразу
+        :return: Конвейер запросов
+        """
+        if self.is_pipeline_supported():
+            query_pipeline: QueryPipeline = QueryPipeline(connection=self, pipelined=True)
+            try:
+                with self._connection.pipeline():
+                    yield query_pipeline
+                query_pipeline.fetch_all()
+            finally:
+                query_pipeline.close()
+        else:
+            yield QueryPipeline(connection=self, pipelined=False)
+
+    def is_pipeline_supported(self) -> bool:
+        return self._base_type == BaseType.POSTGRES and psycopg.Pipeline.is_supported()
+
+    def _submit_select(self, table_name: str, fields: list[str],
+                       key_names: list[str] | None,
+                       key_values: list[str | int | bool | None] | None,
+                       uniq_values: bool,
+                       sort_by: list[str] | None,
+                       key_operator: list[str] | None) -> PendingResult:
+        query, key_values_for_query, fields = self._build_select_query(table_name=table_name,
+                                                                       fields=fields,
+                                                                       key_names=key_names,
+                                                                       key_values=key_values,
+                                                                       uniq_values=uniq_values,
+                                                                       sort_by=sort_by,
+                                                                       key_operator=key_operator)
+        result_cache_key: tuple | None = self._get_result_cache_key(table_name=table_name,
+                                                                    query=query,
+                                                                    params=key_values_for_query,
+                                                                    row_factory=RowFormat.DICT)
+        if result_cache_key is not None:
+            cached_rows: list | None = self._get_cached_result(result_cache_key)
+            if cached_rows is not None:
+                return PendingResult(rows=cached_rows)
+        # Каждый запрос конвейера выполняется в отдельном курсоре, чтобы результаты не перезаписывали друг друга
+        cursor: psycopg.Cursor = self._connection.cursor()
+        self._execute(query, key_values_for_query, prepare=True, cursor=cursor)
+        return PendingResult(cursor=cursor,
+                             fields=fields,
+                             on_result=None if result_cache_key is None else
+                             lambda rows: self._put_cached_result(result_cache_key, rows))
+
+    def normalize_key(self, key: tuple[str | None, ...]) -> tuple[str | None, ...]:
+        """
+        Приведение значений ключа к виду, в котором их сравнивает база (сравнение строк в Access не зависит
+        от регистра)
+        :param key: Значения ключевых полей (строки или None)
+        :return: Значения для сравнения
+        """
+        if self._base_type == BaseType.ACCESS:
+            return tuple(None if value is None else value.upper() for value in key)
+        return key
+
+    def _group_rows(self, rows: list[dict[str, str]], fields: list[str], key_names: list[str],
+                    keys_by_normalized_key: dict[tuple[str, ...], list[tuple[str, ...]]],
+                    result: dict[tuple[str | None, ...], list[dict[str, str]]]) -> None:
+        for row in rows:
+            normalized_key = self.normalize_key(tuple(row[key_name] for key_name in key_names))
+            if normalized_key not in keys_by_normalized_key:
+                continue
+            out_row: dict[str, str] = row if len(row) == len(fields) else {field: row[field] for field in fields}
+            for key in keys_by_normalized_key[normalized_key]:
+                result[key].append(out_row)
+
+    def iter_data(self, table_name: str, fields: list[str],
+                  key_names: list[str] | None = None,
+                  key_values: list[str | int | bool | None] | None = None,
+                  uniq_values: bool = False,
+                  sort_by: list[str] | None = None,
+                  key_operator: list[str] | None = None,
+                  batch_size: int = 1000,
+                  row_factory: RowFormat | type = RowFormat.DICT) -> Iterator:
+        """
+        Потоковое чтение строк таблицы пакетами. Для Postgres используется именованный (серверный) курсор,
+        для Access - отдельный курсор и fetchmany
+        :param batch_size: Число строк, загружаемых за одно обращение к базе
+        :param row_factory: Формат строк (см. retrieve_data)
+        :return: Итератор по строкам в формате retrieve_data
+        """
+        query, key_values_for_query, fields = self._build_select_query(table_name=table_name,
+                                                                       fields=fields,
+                                                                       key_names=key_names,
+                                                                       key_values=key_values,
+                                                                       uniq_values=uniq_values,
+                                                                       sort_by=sort_by,
+                                                                       key_operator=key_operator)
+        for rows in self._iter_row_batches(query=query, params=key_values_for_query, batch_size=batch_size):
+            for row in self._make_rows(rows=rows, fields=fields, row_factory=row_factory):
+                yield row
+
+    def _iter_row_batches(self, query: str, params: list | None, batch_size: int) -> Iterator[list]:
+        """
+        Потоковое выполнение запроса в отдельном курсоре (именованном для Postgres)
+        :return: Итератор по пакетам строк без преобразования значений
+        """
+        cursor: pyodbc.Cursor | psycopg.Cursor | sqlite3.Cursor
+        if self._base_type in (BaseType.ACCESS, BaseType.SQLITE):
+            cursor = self._connection.cursor()
+        elif self._base_type == BaseType.POSTGRES:
+            self._stream_cursor_index += 1
+            cursor = self._connection.cursor(name=f'iter_data_{self._stream_cursor_index}', withhold=True)
+            cursor.itersize = batch_size
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        try:
+            statistics: QueryStatistics = self._execute(query, params, cursor=cursor)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if len(rows) == 0:
+                    break
+                statistics.rows += len(rows)
+                yield rows
+        finally:
+            cursor.close()
+
+    def _build_select_query(self, table_name: str, fields: list[str],
+                            key_names: list[str] | None,
+                            key_values: list[str | int | bool | None] | None,
+                            uniq_values: bool,
+                            sort_by: list[str] | None,
+                            key_operator: list[str] | None) -> \
+            tuple[str, list[str | int | bool] | None, list[str]]:
+        """
+        Формирование текста запроса SELECT
+        :return: Кортеж из текста запроса, значений параметров (None, если параметров нет) и имен столбцов
+        """
+        null_mask: tuple[bool, ...] | None
         if key_names is None and key_values is None:
-            query = 'SELECT {0}{1} FROM {2}{3}'.format(distinct_placeholder, ','.join(fields), table_name,
-                                                       sort_by_placeholder)
-            self._cursor.execute(query)
+            null_mask = None
         elif key_names is not None and key_values is not None:
             if len(key_values) != len(key_names):
                 print('Несоответствие названий ключевых полей и их значений')
                 raise Exception("AccessError")
-
-            key_column_placeholder: str = ''
-            key_values_for_query: list[str | int | bool] = []
-            for index in range(len(key_values)):
-                if key_values[index] is None:
-                    part_string = '{0} {1} NULL'.format(key_names[index],
-                                                        'IS' if key_operator is None else key_operator[index])
-                else:
-                    if self._base_type == BaseType.ACCESS:
-                        part_string = '{0} {1} ?'.format(key_names[index],
-                                                         '=' if key_operator is None else key_operator[index])
-                    elif self._base_type == BaseType.POSTGRES:
-
-                        part_string = '{0} {1} %s'.format(key_names[index],
-                                                          '=' if key_operator is None else key_operator[index])
-                    else:
-                        raise Exception("Неподдерживаемый тип DBEngine")
-                    key_values_for_query.append(key_values[index])
-                key_column_placeholder = part_string if key_column_placeholder == '' else \
-                    key_column_placeholder + ' AND ' + part_string
-
-            query = 'SELECT {0}{1} FROM {2} WHERE {3}{4}'.format(distinct_placeholder, ', '.join(fields),
-                                                                 table_name, key_column_placeholder,
-                                                                 sort_by_placeholder)
-            self._cursor.execute(query, key_values_for_query)
+            null_mask = tuple(value is None for value in key_values)
         else:
             print('Несоответствие названий ключевых полей и их значений')
             raise Exception("AccessError")
 
+        cache_key: tuple = ('SELECT', table_name, tuple(fields), self._to_tuple(key_names),
+                            self._to_tuple(key_operator), null_mask, uniq_values, self._to_tuple(sort_by))
+        cached_query: tuple[str, list[str]] | None = self._get_cached_query(cache_key)
+        if cached_query is None:
+            table_name = self.modify_table_name(table_name)
+            fields = self.modify_column_names(fields)
+            key_names = self.modify_column_names(key_names)
+            sort_by = self.modify_column_names(sort_by)
+
+            distinct_placeholder: str = ' DISTINCT ' if uniq_values else ''
+            sort_by_placeholder: str = ' ORDER BY ' + ' ,'.join(sort_by) + ' ASC' if sort_by is not None else ''
+            if null_mask is None:
+                query = 'SELECT {0}{1} FROM {2}{3}'.format(distinct_placeholder, ','.join(fields), table_name,
+                                                           sort_by_placeholder)
+            else:
+                query = 'SELECT {0}{1} FROM {2} WHERE {3}{4}'.format(
+                    distinct_placeholder, ', '.join(fields), table_name,
+                    self._build_where_clause(key_names=key_names, null_mask=null_mask, key_operator=key_operator),
+                    sort_by_placeholder)
+            cached_query = (query, fields)
+            self._query_cache[cache_key] = cached_query
+
+        if null_mask is None:
+            return cached_query[0], None, cached_query[1]
+        return cached_query[0], [value for value in key_values if value is not None], cached_query[1]
+
+    def _build_where_clause(self, key_names: list[str], null_mask: tuple[bool, ...],
+                            key_operator: list[str] | None) -> str:
+        """
+        Формирование условия WHERE для ключевых полей (имена полей уже преобразованы)
+        :param key_names: Имена ключевых полей
+        :param null_mask: Признаки значений NULL для каждого ключевого поля
+        :param key_operator: Операторы сравнения
+        :return: Текст условия
+        """
+        param_place_holder: str = self._get_param_placeholder()
+        conditions: list[str] = []
+        for index in range(len(key_names)):
+            if null_mask[index]:
+                conditions.append('{0} {1} NULL'.format(key_names[index],
+                                                        'IS' if key_operator is None else key_operator[index]))
+            else:
+                conditions.append('{0} {1} {2}'.format(key_names[index],
+                                                       '=' if key_operator is None else key_operator[index],
+                                                       param_place_holder))
+        return ' AND '.join(conditions)
+
+    def _get_param_placeholder(self) -> str:
+        if self._base_type in (BaseType.ACCESS, BaseType.SQLITE):
+            return '?'
+        elif self._base_type == BaseType.POSTGRES:
+            return '%s'
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+
+    def _get_cached_query(self, cache_key: tuple) -> tuple | None:
+        """
+        Поиск готового текста запроса в кэше по форме запроса
+        :param cache_key: Форма запроса (операция, таблица, поля, ключи, операторы, признаки NULL)
+        :return: Сохраненный результат формирования запроса или None
+        """
+        cached_query: tuple | None = self._query_cache.get(cache_key)
+        if cached_query is None:
+            self._query_cache_misses += 1
+        else:
+            self._query_cache_hits += 1
+        return cached_query
+
+    def get_query_cache_statistics(self) -> tuple[int, int]:
+        """
+        Статистика кэша текстов запросов
+        :return: Кортеж из числа попаданий и числа промахов
+        """
+        return self._query_cache_hits, self._query_cache_misses
+
+    @staticmethod
+    def _to_tuple(values: list[str] | None) -> tuple[str, ...] | None:
+        return None if values is None else tuple(values)
+
+    def _execute(self, query: str, params: list | tuple | None = None, prepare: bool = False,
+                 cursor: pyodbc.Cursor | psycopg.Cursor | sqlite3.Cursor | None = None) -> QueryStatistics:
+        """
+        Выполнение запроса с учетом времени выполнения в статистике запросов
+        :param query: Текст запроса
+        :param params: Значения параметров (None, если параметров нет)
+        :param prepare: Использовать подготовленный запрос (только для Postgres)
+        :param cursor: Курсор для выполнения (по умолчанию - основной курсор соединения)
+        :return: Статистика формы запроса (для учета числа загруженных строк)
+        """
+        cursor = self._cursor if cursor is None else cursor
+        start_time: float = time.perf_counter()
+        if params is None:
+            cursor.execute(query)
+        elif prepare and self._base_type == BaseType.POSTGRES:
+            cursor.execute(query, params, prepare=True)
+        else:
+            cursor.execute(query, params)
+        return self._record_statement(query=query, params=params, elapsed_time=time.perf_counter() - start_time)
+
+    def _executemany(self, query: str, rows: list[list | tuple]) -> None:
+        start_time: float = time.perf_counter()
+        self._cursor.executemany(query, rows)
+        self._record_statement(query=query, params=None, elapsed_time=time.perf_counter() - start_time,
+                               row_count=len(rows))
+
+    def _fetchall(self) -> list:
+        rows: list = self._cursor.fetchall()
+        if self._last_statistics is not None:
+            self._last_statistics.rows += len(rows)
+        return rows
+
+    def _record_statement(self, query: str, params: list | tuple | None, elapsed_time: float,
+                          row_count: int = 0) -> QueryStatistics:
+        """
+        Учет выполненного запроса в статистике и запись медленного запроса в лог
+        :param query: Текст запроса
+        :param params: Значения параметров
+        :param elapsed_time: Время выполнения, с
+        :param row_count: Число записанных строк (для пакетной записи)
+        :return: Статистика формы запроса
+        """
+        shape: str = self._get_query_shape(query)
+        statistics: QueryStatistics | None = self._query_statistics.get(shape)
+        if statistics is None:
+            statistics = QueryStatistics()
+            self._query_statistics[shape] = statistics
+        statistics.add(elapsed_time)
+        statistics.rows += row_count
+        self._last_statistics = statistics
+        if self.SLOW_QUERY_THRESHOLD is not None and elapsed_time >= self.SLOW_QUERY_THRESHOLD:
+            logging.warning('Медленный запрос ({0:.3f} с): {1}; параметры: {2}'.format(elapsed_time, query, params))
+        return statistics
+
+    @staticmethod
+    def _get_query_shape(query: str) -> str:
+        """
+        Нормализованная форма запроса: литералы заменены на ?, списки параметров и условий свернуты
+        """
+        shape: str = re.sub(r"'(?:[^']|'')*'", '?', query)
+        shape = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])', '?', shape)
+        shape = shape.replace('%s', '?')
+        shape = re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', shape)
+        shape = re.sub(r'\(([^()]*)\)(?:\s*,\s*\(\1\))+', r'(\1), ...', shape)
+        shape = re.sub(r'\(([^()]*)\)(?:\s+OR\s+\(\1\))+', r'(\1) OR ...', shape)
+        return ' '.join(shape.split())
+
+    def reset_query_statistics(self) -> None:
+        self._query_statistics = {}
+        self._last_statistics = None
+        self._result_cache_hits = 0
+        self._result_cache_misses = 0
+
+    def get_query_statistics(self) -> dict[str, QueryStatistics]:
+        """
+        Статистика выполненных запросов
+        :return: Словарь, где ключ - нормализованная форма запроса, значение - статистика
+        """
+        return self._query_statistics
+
+    def log_query_statistics(self, stage_name: str) -> None:
+        """
+        Запись в лог отчета по запросам этапа: число вызовов, суммарное время, процентили времени выполнения
+        и число строк для наиболее затратных форм запросов
+        :param stage_name: Имя этапа
+        :return: None
+        """
+        total_count: int = sum(statistics.count for statistics in self._query_statistics.values())
+        total_time: float = sum(statistics.total_time for statistics in self._query_statistics.values())
+        logging.info('Запросы этапа "{0}": {1} запросов {2} форм, {3:.3f} с'.format(
+            stage_name, total_count, len(self._query_statistics), total_time))
+        result_cache_hits, result_cache_misses = self.get_result_cache_statistics()
+        if result_cache_hits + result_cache_misses > 0:
+            logging.info('Кэш результатов: попаданий {0}, промахов {1} ({2:.1f}% попаданий)'.format(
+                result_cache_hits, result_cache_misses,
+                100 * result_cache_hits / (result_cache_hits + result_cache_misses)))
+        report: list[tuple[str, QueryStatistics]] = sorted(self._query_statistics.items(),
+                                                           key=lambda item: item[1].total_time,
+                                                           reverse=True)[:self.QUERY_REPORT_SIZE]
+        for shape, statistics in report:
+            logging.info('  {0:>8} выз. {1:>9.3f} с p50 {2:.4f} p95 {3:.4f} p99 {4:.4f} max {5:.4f} строк {6:>9}: '
+                         '{7}'.format(statistics.count, statistics.total_time, statistics.get_percentile(50),
+                                      statistics.get_percentile(95), statistics.get_percentile(99),
+                                      statistics.max_time, statistics.rows, shape))
+
+    def _make_rows(self, rows: list, fields: list[str], row_factory: RowFormat | type) -> list:
+        if row_factory == RowFormat.DICT:
+            return self._convert_rows(rows=rows, fields=fields)
+        if row_factory == RowFormat.TUPLE:
+            return [tuple(row) for row in rows]
+        if row_factory == RowFormat.NAMED_TUPLE:
+            row_type: type | None = self._row_types.get(tuple(fields))
+            if row_type is None:
+                row_type = namedtuple('Row', fields, rename=True)
+                self._row_types[tuple(fields)] = row_type
+            return [row_type._make(row) for row in rows]
+        if isinstance(row_factory, type):
+            return [row_factory(*row) for row in rows]
+        raise Exception("Неподдерживаемый формат строк")
+
+    @staticmethod
+    def _convert_rows(rows: Iterable, fields: list[str]) -> list[dict[str, str]]:
         out_list = []
-        for row in self._cursor.fetchall():
+        for row in rows:
             out_row = {}
             for column_index in range(len(fields)):
                 out_row[fields[column_index]] = None if row[column_index] is None else str(row[column_index])
@@ -94,8 +1009,8 @@ class Connection:
         table_name = self.modify_table_name(table_name)
         if self._base_type == BaseType.ACCESS:
             return set([row.column_name for row in self._cursor.columns(table=table_name.strip('[]'))])
-        elif self._base_type == BaseType.POSTGRES:
-            self._cursor.execute(f'Select * FROM {table_name} LIMIT 0')
+        elif self._base_type in (BaseType.POSTGRES, BaseType.SQLITE):
+            self._execute(f'Select * FROM {table_name} LIMIT 0')
             return set([desc[0] for desc in self._cursor.description])
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
@@ -104,9 +1019,6 @@ class Connection:
                        key_names: list[str] | None,
                        key_values: list[str],
                        key_operator: list[str] | None = None) -> bool:
-        table_name = self.modify_table_name(table_name)
-        key_names = self.modify_column_names(key_names)
-
         return self.count_values(table_name=table_name,
                                  key_names=key_names,
                                  key_values=key_values,
@@ -120,31 +1032,17 @@ class Connection:
             print("Несоответствие названий ключевых полей и их значений")
             raise Exception("AccessError")
 
-        table_name = self.modify_table_name(table_name)
-        key_names = self.modify_column_names(key_names)
-
-        key_column_placeholder: str = ''
-        key_values_for_query: list[str | int | bool] = []
-        for index in range(len(key_values)):
-            if key_values[index] is None:
-                part_string = '{0} {1} NULL'.format(key_names[index],
-                                                    'IS' if key_operator is None else key_operator[index])
-            else:
-                if self._base_type == BaseType.ACCESS:
-                    part_string = '{0} {1} ?'.format(key_names[index],
-                                                     '=' if key_operator is None else key_operator[index])
-                elif self._base_type == BaseType.POSTGRES:
-                    part_string = '{0} {1} %s'.format(key_names[index],
-                                                      '=' if key_operator is None else key_operator[index])
-                else:
-                    raise Exception("Неподдерживаемый тип DBEngine")
-
-                key_values_for_query.append(key_values[index])
-            key_column_placeholder = part_string if key_column_placeholder == '' else \
-                key_column_placeholder + ' AND ' + part_string
-
-        query = 'SELECT COUNT(*) FROM {0} WHERE {1}'.format(table_name, key_column_placeholder)
-        self._cursor.execute(query, key_values_for_query)
+        null_mask: tuple[bool, ...] = tuple(value is None for value in key_values)
+        cache_key: tuple = ('COUNT', table_name, tuple(key_names), self._to_tuple(key_operator), null_mask)
+        query: str | None = self._get_cached_query(cache_key)
+        if query is None:
+            query = 'SELECT COUNT(*) FROM {0} WHERE {1}'.format(
+                self.modify_table_name(table_name),
+                self._build_where_clause(key_names=self.modify_column_names(key_names),
+                                         null_mask=null_mask,
+                                         key_operator=key_operator))
+            self._query_cache[cache_key] = query
+        self._execute(query, [value for value in key_values if value is not None], prepare=True)
         return int(self._cursor.fetchall()[0][0])
 
     def retrieve_data_from_joined_table(self, table_name1: str, table_name2,
@@ -171,7 +1069,7 @@ class Connection:
                                                                              table_name1, table_name2,
                                                                              join_placeholder,
                                                                              sort_by_placeholder)
-            self._cursor.execute(query)
+            self._execute(query)
         elif key_names is not None and key_values is not None:
             if len(key_values) != len(key_names):
                 print("Несоответствие названий ключевых полей и их значений")
@@ -180,51 +1078,73 @@ class Connection:
             query = 'SELECT {0}{1} FROM {2} INNER JOIN {3} ON {4} WHERE {5}{6}'.format(
                 distinct_placeholder, ','.join(fields), table_name1, table_name2, join_placeholder,
                 ' AND '.join(key_column_placeholder), sort_by_placeholder)
-            self._cursor.execute(query, key_values)
+            self._execute(query, key_values)
         else:
             print("Несоответствие названий ключевых полей и их значений")
             raise Exception("AccessError")
-        out_list = []
-        for row in self._cursor.fetchall():
-            out_row = {}
-            for column_index in range(len(fields)):
-                out_row[fields[column_index]] = None if row[column_index] is None else str(row[column_index])
-            out_list.append(out_row)
-        return out_list
+        return self._convert_rows(rows=self._fetchall(), fields=fields)
 
     def remove_row(self, table_name: str, key_names: list[str], key_values: list[str]) -> None:
-        table_name = self.modify_table_name(table_name)
-        key_names = self.modify_column_names(key_names)
-        param_place_holder: str
-        if self._base_type == BaseType.ACCESS:
-            param_place_holder = '?'
-        elif self._base_type == BaseType.POSTGRES:
-            param_place_holder = '%s'
-        else:
-            raise Exception("Неподдерживаемый тип DBEngine")
-
-        key_column_placeholder = ['{0} = {1}'.format(item, param_place_holder) for item in key_names]
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
         if len(key_values) != len(key_names):
             print("Неверное число значений ключевых полей")
             raise Exception("AccessError")
 
-        query = 'DELETE FROM {0} WHERE {1}'.format(table_name, ' AND '.join(key_column_placeholder))
-        self._cursor.execute(query, key_values)
+        cache_key: tuple = ('DELETE', table_name, tuple(key_names))
+        query: str | None = self._get_cached_query(cache_key)
+        if query is None:
+            param_place_holder: str = self._get_param_placeholder()
+            key_column_placeholder = ['{0} = {1}'.format(item, param_place_holder)
+                                      for item in self.modify_column_names(key_names)]
+            query = 'DELETE FROM {0} WHERE {1}'.format(self.modify_table_name(table_name),
+                                                       ' AND '.join(key_column_placeholder))
+            self._query_cache[cache_key] = query
+        self._execute(query, key_values, prepare=True)
+        self._uncommitted_rows += 1
 
-    def update_field(self, table_name: str, fields: list[str], values: list[str], key_names: list[str],
-                     key_values: list[str]) -> None:
-        table_name = self.modify_table_name(table_name)
-        fields = self.modify_column_names(fields)
-        key_names = self.modify_column_names(key_names)
+    def remove_rows(self, table_name: str, key_names: list[str], rows: Iterable[list | tuple]) -> int:
+        """
+        Пакетное удаление строк по значениям ключевых полей (executemany параметризованного DELETE).
+        Значения None сравниваются через IS NULL
+        :param table_name: Имя таблицы
+        :param key_names: Имена ключевых полей
+        :param rows: Значения ключевых полей удаляемых строк
+        :return: Число переданных для удаления ключей
+        """
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
+        keys_by_null_mask: dict[tuple[bool, ...], list[list]] = {}
+        key_count: int = 0
+        for key_values in rows:
+            if len(key_values) != len(key_names):
+                print("Неверное число значений ключевых полей")
+                raise Exception("AccessError")
+            null_mask: tuple[bool, ...] = tuple(value is None for value in key_values)
+            keys_by_null_mask.setdefault(null_mask, []).append([value for value in key_values if value is not None])
+            key_count += 1
+        if key_count == 0:
+            return 0
 
-        param_place_holder: str
-        if self._base_type == BaseType.ACCESS:
-            param_place_holder = '?'
-        elif self._base_type == BaseType.POSTGRES:
-            param_place_holder = '%s'
-        else:
-            raise Exception("Неподдерживаемый тип DBEngine")
+        modified_key_names: list[str] = self.modify_column_names(key_names)
+        for null_mask, keys in keys_by_null_mask.items():
+            query: str = 'DELETE FROM {0} WHERE {1}'.format(
+                self.modify_table_name(table_name),
+                self._build_where_clause(key_names=modified_key_names, null_mask=null_mask, key_operator=None))
+            if all(null_mask):
+                self._execute(query)
+                continue
+            if self._base_type == BaseType.ACCESS:
+                self._cursor.fast_executemany = True
+            for batch in self._split_to_batches(keys, self.INSERT_BATCH_SIZE):
+                self._executemany(query, batch)
+        self._uncommitted_rows += key_count
+        return key_count
 
+    def update_field(self, table_name: str, fields: list[str], values: list[str], key_names: list[str],
+                     key_values: list[str]) -> None:
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
         if len(key_values) != len(key_names):
             print("Несоответствие названий ключевых полей и их значений")
             raise Exception("AccessError")
@@ -232,20 +1152,23 @@ class Connection:
             print("Несоответствие названий обновляемых полей и их значений")
             raise Exception("AccessError")
 
-        values_placeholder: str = ','.join(
-            ['{0}={1}'.format(fields[index], param_place_holder) for index in range(len(fields))])
-        param_place_holder: str
-        if self._base_type == BaseType.ACCESS:
-            param_place_holder = '?'
-        elif self._base_type == BaseType.POSTGRES:
-            param_place_holder = '%s'
-        else:
-            raise Exception("Неподдерживаемый тип DBEngine")
-        key_column_placeholder = ['{0} = {1}'.format(item, param_place_holder) for item in key_names]
+        query: str = self._build_update_query(table_name=table_name, fields=fields, key_names=key_names)
+        self._execute(query, list(values) + list(key_values), prepare=True)
+        self._uncommitted_rows += 1
 
-        query = 'UPDATE {0} SET {1} WHERE {2}'.format(table_name, values_placeholder,
-                                                      ' AND '.join(key_column_placeholder))
-        self._cursor.execute(query, values + key_values)
+    def _build_update_query(self, table_name: str, fields: list[str], key_names: list[str]) -> str:
+        cache_key: tuple = ('UPDATE', table_name, tuple(fields), tuple(key_names))
+        query: str | None = self._get_cached_query(cache_key)
+        if query is None:
+            param_place_holder: str = self._get_param_placeholder()
+            values_placeholder: str = ','.join(['{0}={1}'.format(field, param_place_holder)
+                                                for field in self.modify_column_names(fields)])
+            key_column_placeholder = ['{0} = {1}'.format(item, param_place_holder)
+                                      for item in self.modify_column_names(key_names)]
+            query = 'UPDATE {0} SET {1} WHERE {2}'.format(self.modify_table_name(table_name), values_placeholder,
+                                                          ' AND '.join(key_column_placeholder))
+            self._query_cache[cache_key] = query
+        return query
 
     def retrive_data_with_having(self, table_name: str, fields: list[str], key_column: str,
                                  key_values: list[str]):
@@ -260,29 +1183,27 @@ class Connection:
                                                                                condition_placeholder,
                                                                                having_placeholder)
 
-        self._cursor.execute(query, key_values)
-        out_list = []
-        for row in self._cursor.fetchall():
-            out_row = {}
-            for column_index in range(len(fields)):
-                out_row[fields[column_index]] = None if row[column_index] is None else str(row[column_index])
-            out_list.append(out_row)
-        return out_list
+        self._execute(query, key_values)
+        return self._convert_rows(rows=self._fetchall(), fields=fields)
 
     def clear_table(self, table_name: str, drop_index: bool = False) -> None:
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
         table_name = self.modify_table_name(table_name)
 
         if self._base_type == BaseType.ACCESS:
-            self._cursor.execute(f'DELETE * From {table_name}')
+            self._execute(f'DELETE * From {table_name}')
             if drop_index:
-                self._cursor.execute(f'ALTER TABLE {table_name} ALTER COLUMN ID COUNTER(1,1)')
-        elif self._base_type == BaseType.POSTGRES:
-            self._cursor.execute(f'DELETE From {table_name}')
+                self._execute(f'ALTER TABLE {table_name} ALTER COLUMN ID COUNTER(1,1)')
+        elif self._base_type in (BaseType.POSTGRES, BaseType.SQLITE):
+            self._execute(f'DELETE From {table_name}')
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
-        self.commit()
+        self._uncommitted_rows += 1
 
     def insert_row(self, table_name: str, column_names: list[str], values: list[str | int | float | None]) -> None:
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
         table_name = self.modify_table_name(table_name)
         column_names = self.modify_column_names(column_names)
 
@@ -294,94 +1215,715 @@ class Connection:
             [self.get_string_value(item) for item in values])
         query: str = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(table_name, column_name_placeholder,
                                                                  values_placeholder)
-        self._cursor.execute(query)
+        self._execute(query)
+        self._uncommitted_rows += 1
+
+    def insert_rows(self, table_name: str, column_names: list[str],
+                    rows: Iterable[list[str | int | float | bool | None] | tuple]) -> int:
+        """
+        Пакетная запись строк в таблицу (COPY для Postgres, fast_executemany для Access)
+        :param table_name: Имя таблицы
+        :param column_names: Имена столбцов
+        :param rows: Строки со значениями в порядке column_names
+        :return: Число записанных строк
+        """
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
+        table_name = self.modify_table_name(table_name)
+        column_names = self.modify_column_names(column_names)
+
+        start_time: float = time.perf_counter()
+        row_count: int = self._write_rows(table_name=table_name, column_names=column_names, rows=rows)
+        elapsed_time: float = time.perf_counter() - start_time
+        self._uncommitted_rows += row_count
+        if row_count > 0:
+            logging.debug('Запись в таблицу {0}: {1} строк за {2:.3f} с ({3:.0f} строк/с)'.format(
+                table_name, row_count, elapsed_time, row_count / elapsed_time if elapsed_time > 0 else 0))
+        return row_count
+
+    def copy_rows(self, table_name: str, source_table_name: str, column_names: list[str],
+                  key_name: str | None = None, key_values: Iterable[str | None] | None = None,
+                  source_connection: 'Connection | None' = None) -> int:
+        """
+        Копирование строк из одной таблицы в другую. Для таблиц одной базы копирование выполняется на стороне
+        сервера запросом INSERT INTO ... SELECT (для Access и SQLite - пакетами условий IN, для Postgres -
+        = ANY(%s)). Если таблица-источник находится в другой базе (source_connection), строки загружаются
+        потоково и записываются через insert_rows
+        :param table_name: Имя таблицы, в которую копируются строки
+        :param source_table_name: Имя таблицы-источника
+        :param column_names: Имена копируемых столбцов (одинаковые в обеих таблицах)
+        :param key_name: Имя поля для отбора строк (None - копируются все строки)
+        :param key_values: Значения поля для отбора строк (None сравнивается через IS NULL)
+        :param source_connection: Соединение с базой таблицы-источника (по умолчанию - это соединение)
+        :return: Число скопированных строк
+        """
+        self._check_writable()
+        if key_name is not None and key_values is None:
+            print("Не заданы значения ключевого поля")
+            raise Exception("AccessError")
+        keys: list[str] | None = None
+        copy_null_keys: bool = False
+        if key_values is not None:
+            keys_by_normalized_key: dict[tuple[str | None, ...], str] = {}
+            for value in key_values:
+                if value is None:
+                    copy_null_keys = True
+                else:
+                    # Access сравнивает строки без учета регистра, одинаковые ключи копировали бы строки повторно
+                    keys_by_normalized_key.setdefault(self.normalize_key((value,)), value)
+            keys = list(keys_by_normalized_key.values())
+
+        if source_connection is not None and source_connection is not self:
+            source_fields: list[str] = column_names if key_name is None or key_name in column_names else \
+                column_names + [key_name]
+            values: Iterator[tuple] = source_connection.iter_data(table_name=source_table_name,
+                                                                  fields=source_fields,
+                                                                  batch_size=self.COPY_BATCH_SIZE,
+                                                                  row_factory=RowFormat.TUPLE)
+            if keys is not None:
+                key_index: int = source_fields.index(key_name)
+                normalized_keys: set[tuple[str | None, ...]] = {self.normalize_key((key,)) for key in keys}
+                values = (value for value in values
+                          if (copy_null_keys if value[key_index] is None else
+                              self.normalize_key((str(value[key_index]),)) in normalized_keys))
+            return self.insert_rows(table_name=table_name,
+                                    column_names=column_names,
+                                    rows=(value[:len(column_names)] for value in values))
+
+        self._invalidate_result_cache(table_name)
+        columns_placeholder: str = ', '.join(self.modify_column_names(column_names))
+        query: str = 'INSERT INTO {0} ({1}) SELECT {1} FROM {2}'.format(self.modify_table_name(table_name),
+                                                                      columns_placeholder,
+                                                                      self.modify_table_name(source_table_name))
+        queries: list[tuple[str, list | None]] = []
+        if keys is None:
+            queries.append((query, None))
+        else:
+            key_name = self.modify_column_name(key_name)
+            if copy_null_keys:
+                queries.append((f'{query} WHERE {key_name} IS NULL', None))
+            if self._base_type in (BaseType.ACCESS, BaseType.SQLITE):
+                keys_batch_size: int = self.ACCESS_KEYS_BATCH_SIZE if self._base_type == BaseType.ACCESS \
+                    else self.SQLITE_KEYS_BATCH_SIZE
+                for batch in self._split_to_batches(keys, keys_batch_size):
+                    queries.append(('{0} WHERE {1} IN ({2})'.format(query, key_name, ','.join(['?'] * len(batch))),
+                                    batch))
+            elif self._base_type == BaseType.POSTGRES:
+                if len(keys) > 0:
+                    queries.append((f'{query} WHERE {key_name} = ANY(%s)', [keys]))
+            else:
+                raise Exception("Неподдерживаемый тип DBEngine")
+
+        start_time: float = time.perf_counter()
+        row_count: int = 0
+        for query, params in queries:
+            statistics: QueryStatistics = self._execute(query, params)
+            statistics.rows += max(self._cursor.rowcount, 0)
+            row_count += max(self._cursor.rowcount, 0)
+        self._uncommitted_rows += row_count
+        logging.debug('Копирование {0} -> {1}: {2} строк за {3:.3f} с'.format(
+            source_table_name, table_name, row_count, time.perf_counter() - start_time))
+        return row_count
+
+    def _write_rows(self, table_name: str, column_names: list[str],
+                    rows: Iterable[list[str | int | float | bool | None] | tuple]) -> int:
+        """
+        Пакетная запись строк (имена таблицы и столбцов уже преобразованы)
+        :return: Число записанных строк
+        """
+        row_count: int = 0
+        if self._base_type == BaseType.ACCESS:
+            query: str = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(table_name, ','.join(column_names),
+                                                                     ','.join(['?'] * len(column_names)))
+            self._cursor.fast_executemany = True
+            for batch in self._split_to_batches(rows, self.INSERT_BATCH_SIZE):
+                self._check_row_lengths(batch, len(column_names))
+                self._executemany(query, batch)
+                row_count += len(batch)
+        elif self._base_type == BaseType.SQLITE:
+            query: str = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(table_name, ','.join(column_names),
+                                                                     ','.join(['?'] * len(column_names)))
+            for batch in self._split_to_batches(rows, self.INSERT_BATCH_SIZE):
+                self._check_row_lengths(batch, len(column_names))
+                self._executemany(query, batch)
+                row_count += len(batch)
+        elif self._base_type == BaseType.POSTGRES:
+            # Источник строк может быть потоковым (iter_data) на этом же соединении, поэтому строки
+            # вычитываются пакетами вне COPY
+            query: str = 'COPY {0} ({1}) FROM STDIN'.format(table_name, ','.join(column_names))
+            for batch in self._split_to_batches(rows, self.COPY_BATCH_SIZE):
+                self._check_row_lengths(batch, len(column_names))
+                start_time: float = time.perf_counter()
+                with self._cursor.copy(query) as copy:
+                    for row in batch:
+                        copy.write_row(row)
+                self._record_statement(query=query, params=None, elapsed_time=time.perf_counter() - start_time,
+                                       row_count=len(batch))
+                row_count += len(batch)
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        return row_count
+
+    def update_fields_bulk(self, table_name: str, fields: list[str], key_names: list[str],
+                           rows: Iterable[tuple[list | tuple, list | tuple]]) -> int:
+        """
+        Пакетное обновление полей. Для Postgres строки загружаются через COPY во временную таблицу, после чего
+        выполняется один UPDATE ... FROM, для Access - executemany параметризованного UPDATE
+        :param table_name: Имя таблицы
+        :param fields: Обновляемые поля
+        :param key_names: Имена ключевых полей
+        :param rows: Список пар (значения ключевых полей, новые значения полей)
+        :return: Число переданных для обновления строк
+        """
+        self._check_writable()
+        self._invalidate_result_cache(table_name)
+        # При повторе ключа действует последнее значение, как при последовательных update_field
+        updates: dict[tuple, tuple] = {}
+        for key_values, values in rows:
+            if len(key_values) != len(key_names):
+                print("Несоответствие названий ключевых полей и их значений")
+                raise Exception("AccessError")
+            if len(values) != len(fields):
+                print("Несоответствие названий обновляемых полей и их значений")
+                raise Exception("AccessError")
+            key: tuple = tuple(key_values)
+            updates.pop(key, None)
+            updates[key] = tuple(values)
+        if len(updates) == 0:
+            return 0
+
+        table_name = self.modify_table_name(table_name)
+        fields = self.modify_column_names(fields)
+        key_names = self.modify_column_names(key_names)
+
+        if self._base_type in (BaseType.ACCESS, BaseType.SQLITE):
+            values_placeholder: str = ','.join(['{0}=?'.format(field) for field in fields])
+            key_column_placeholder: str = ' AND '.join(['{0} = ?'.format(key_name) for key_name in key_names])
+            query: str = 'UPDATE {0} SET {1} WHERE {2}'.format(table_name, values_placeholder, key_column_placeholder)
+            if self._base_type == BaseType.ACCESS:
+                self._cursor.fast_executemany = True
+            for batch in self._split_to_batches(updates.items(), self.INSERT_BATCH_SIZE):
+                self._executemany(query, [list(values) + list(key) for key, values in batch])
+        elif self._base_type == BaseType.POSTGRES:
+            temp_table_name: str = 'bulk_update_{0}'.format(table_name.strip('"'))
+            temp_columns: list[str] = ['key_{0}'.format(index) for index in range(len(key_names))] + \
+                                      ['value_{0}'.format(index) for index in range(len(fields))]
+            # Временная таблица повторяет типы столбцов целевой таблицы
+            self._execute('DROP TABLE IF EXISTS {0}'.format(temp_table_name))
+            self._execute('CREATE TEMP TABLE {0} AS SELECT {1} FROM {2} LIMIT 0'.format(
+                temp_table_name,
+                ', '.join(['{0} AS {1}'.format(column, temp_column)
+                           for column, temp_column in zip(key_names + fields, temp_columns)]),
+                table_name))
+            self._write_rows(table_name=temp_table_name,
+                             column_names=temp_columns,
+                             rows=(list(key) + list(values) for key, values in updates.items()))
+            self._execute('UPDATE {0} SET {1} FROM {2} WHERE {3}'.format(
+                table_name,
+                ', '.join(['{0} = {1}.value_{2}'.format(field, temp_table_name, index)
+                           for index, field in enumerate(fields)]),
+                temp_table_name,
+                ' AND '.join(['{0}.{1} = {2}.key_{3}'.format(table_name, key_name, temp_table_name, index)
+                              for index, key_name in enumerate(key_names)])))
+            self._execute('DROP TABLE {0}'.format(temp_table_name))
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        self._uncommitted_rows += len(updates)
+        return len(updates)
+
+    @staticmethod
+    def _check_row_lengths(rows: list[list | tuple], columns_count: int) -> None:
+        if any(len(row) != columns_count for row in rows):
+            print("Несоответствие количества столбцов количеству значений")
+            raise Exception("SQLError")
+
+    @staticmethod
+    def _split_to_batches(rows: Iterable, batch_size: int) -> Iterator[list]:
+        batch: list = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
 
     def get_row_count(self, table_name: str) -> int:
         table_name = self.modify_table_name(table_name)
         queury: str = f'SELECT COUNT(*) FROM {table_name}'
-        self._cursor.execute(queury)
+        self._execute(queury)
         if self._base_type == BaseType.ACCESS:
             return int(self._cursor.fetchval())
-        elif self._base_type == BaseType.POSTGRES:
+        elif self._base_type in (BaseType.POSTGRES, BaseType.SQLITE):
             return int(self._cursor.fetchone()[0])
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
 
+    def set_transaction_policy(self, policy: TransactionPolicy, commit_rows: int = 10000,
+                               commit_interval: float = 5.0) -> None:
+        """
+        Выбор момента фиксации изменений при вызовах commit. Изменения, фиксация которых отложена, фиксируются
+        при закрытии соединения без ошибки
+        :param policy: Политика фиксации
+        :param commit_rows: Число записанных строк между фиксациями (TransactionPolicy.ROWS)
+        :param commit_interval: Время между фиксациями, с (TransactionPolicy.INTERVAL)
+        :return: None
+        """
+        self._transaction_policy = policy
+        self._commit_rows = commit_rows
+        self._commit_interval = commit_interval
+
     def commit(self):
+        if self._transaction_policy == TransactionPolicy.IMMEDIATE or \
+                (self._transaction_policy == TransactionPolicy.ROWS and
+                 self._uncommitted_rows >= self._commit_rows) or \
+                (self._transaction_policy == TransactionPolicy.INTERVAL and
+                 time.perf_counter() - self._last_commit_time >= self._commit_interval):
+            self._commit()
+        else:
+            self._pending_commit = True
+
+    def _commit(self) -> None:
         if self._base_type == BaseType.ACCESS:
             self._cursor.commit()
-        elif self._base_type == BaseType.POSTGRES:
+        elif self._base_type in (BaseType.POSTGRES, BaseType.SQLITE):
             self._connection.commit()
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
+        self._reset_transaction_state()
+
+    def rollback(self) -> None:
+        """
+        Отмена всех незафиксированных изменений (в т.ч. изменений, фиксация которых отложена политикой транзакций)
+        :return: None
+        """
+        self._connection.rollback()
+        self._reset_transaction_state()
+        self._on_rollback()
+
+    def _reset_transaction_state(self) -> None:
+        self._uncommitted_rows = 0
+        self._last_commit_time = time.perf_counter()
+        self._pending_commit = False
+        self._savepoint_index = 0
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """
+        Точка сохранения: при ошибке внутри блока отменяются только изменения блока, изменения до блока остаются
+        в транзакции и фиксируются по политике транзакций. Access не поддерживает точки сохранения: при ошибке
+        отменяются все незафиксированные изменения (для политики IMMEDIATE при фиксации после каждого блока
+        это только изменения блока)
+        :return: None
+        """
+        if self._base_type == BaseType.ACCESS:
+            try:
+                yield
+            except BaseException:
+                self.rollback()
+                raise
+        elif self._base_type in (BaseType.POSTGRES, BaseType.SQLITE):
+            self._savepoint_index += 1
+            savepoint_name: str = f'sp_{self._savepoint_index}'
+            if self._base_type == BaseType.SQLITE and not self._connection.in_transaction:
+                # Без открытой транзакции RELEASE в SQLite фиксирует изменения
+                self._execute('BEGIN')
+            self._execute(f'SAVEPOINT {savepoint_name}')
+            try:
+                yield
+            except BaseException:
+                self._execute(f'ROLLBACK TO SAVEPOINT {savepoint_name}')
+                self._execute(f'RELEASE SAVEPOINT {savepoint_name}')
+                self._on_rollback()
+                raise
+            self._execute(f'RELEASE SAVEPOINT {savepoint_name}')
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+
+    def _on_rollback(self) -> None:
+        # Кэшированные результаты могли включать отмененные изменения
+        if self._result_cache is not None:
+            self._result_cache.clear()
+            self._result_cache_keys = {}
+            self._result_cache_rows = 0
+
+    def get_schema_registry(self) -> SchemaRegistry:
+        if self._schema_registry is None:
+            self._schema_registry = SchemaRegistry(self._base_type)
+        return self._schema_registry
 
     def modify_column_names(self, columns: list[str]) -> list[str] | None:
         if columns is None:
             return None
+        schema_registry: SchemaRegistry = self.get_schema_registry()
+        return [schema_registry.get_column_name(column) for column in columns]
+
+    def modify_column_name(self, column: str) -> str | None:
+        if column is None:
+            return None
+        return self.get_schema_registry().get_column_name(column)
+
+    def get_base_type(self):
+        return self._base_type
+
+    def modify_table_name(self, table_name: str) -> str:
+        # Во время staged_tables запросы к таблице направляются в промежуточную таблицу
+        staged_table: tuple[str, str] | None = self._staged_tables.get(table_name)
+        if staged_table is not None:
+            return staged_table[0]
+        return self.get_schema_registry().get_table_name(table_name)
+
+    @contextmanager
+    def staged_tables(self, table_names: list[str]) -> Iterator[None]:
+        """
+        Перестроение таблиц через промежуточные копии: внутри блока все обращения к таблицам через это
+        соединение направляются в пустые промежуточные таблицы, при выходе из блока содержимое таблиц
+        заменяется в одной транзакции (DELETE и INSERT ... SELECT из промежуточной таблицы). Другие клиенты
+        до этого момента видят прежнее содержимое таблиц. Исходные таблицы не пересоздаются, поэтому
+        зависящие от них представления, права доступа и последовательности сохраняются. При ошибке промежуточные
+        таблицы удаляются, исходные таблицы не изменяются
+        :param table_names: Имена перестраиваемых таблиц
+        :return: None
+        """
+        try:
+            for table_name in table_names:
+                self._begin_staged_table(table_name)
+            yield
+            for table_name in table_names:
+                self._publish_staged_table(table_name)
+            self._commit()
+        except BaseException:
+            self._discard_staged_tables(table_names)
+            raise
+        for table_name in table_names:
+            self._invalidate_result_cache(table_name)
+            del self._staged_tables[table_name]
+        self._query_cache.clear()
+        logging.debug('Таблицы {0} перестроены'.format(', '.join(table_names)))
+
+    def _begin_staged_table(self, table_name: str) -> None:
+        self._check_writable()
+        target_table_name: str = self.modify_table_name(table_name)
         if self._base_type == BaseType.ACCESS:
-            return columns
+            staged_table_name: str = f'[{table_name}_staging]'
+            if f'{table_name}_staging' in self.get_table_names():
+                self._execute(f'DROP TABLE {staged_table_name}')
+            self._execute(f'SELECT * INTO {staged_table_name} FROM {target_table_name} WHERE 1 = 0')
         elif self._base_type == BaseType.POSTGRES:
-            return [self.modify_column_name(column) for column in columns]
+            staged_table_name: str = f'{target_table_name}_staging'
+            self._execute(f'DROP TABLE IF EXISTS {staged_table_name}')
+            self._execute(f'CREATE TABLE {staged_table_name} (LIKE {target_table_name} INCLUDING ALL)')
+        elif self._base_type == BaseType.SQLITE:
+            staged_table_name: str = f'{target_table_name}_staging'
+            self._execute(f'PRAGMA table_info("{target_table_name}")')
+            columns: list[tuple[str, str]] = [(row[1], row[2]) for row in self._cursor.fetchall()]
+            self._execute(f'DROP TABLE IF EXISTS {staged_table_name}')
+            self._execute('CREATE TABLE {0} ({1})'.format(
+                staged_table_name, ', '.join(['"{0}" {1}'.format(column, column_type)
+                                              for column, column_type in columns])))
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
+        self._commit()
+        self._invalidate_result_cache(table_name)
+        self._staged_tables[table_name] = (staged_table_name, target_table_name)
+        self._query_cache.clear()
 
-    def modify_column_name(self, column: str) -> str | None:
-        if column is None:
-            return None
+    def _publish_staged_table(self, table_name: str) -> None:
+        staged_table_name, target_table_name = self._staged_tables[table_name]
         if self._base_type == BaseType.ACCESS:
-            return column
+            # Значения счетчика (COUNTER) формируются заново при вставке
+            columns: list[str] = ['[{0}]'.format(row.column_name)
+                                  for row in self._cursor.columns(table=target_table_name.strip('[]'))
+                                  if row.type_name != 'COUNTER']
+            self._execute(f'DELETE * FROM {target_table_name}')
         elif self._base_type == BaseType.POSTGRES:
-            if column == 'REF':
-                return 'refer'
-            elif column == 'ТАБЛО':
-                return 'indicator_name'
-            elif column == 'TYPE':
-                return 'type_name'
-            elif column == 'SCHEMA':
-                return 'schema_name'
-            elif column == 'COMMENT':
-                return 'comm'
-            elif column == 'GROUP':
-                return 'group_name'
-            elif column == 'MODULE':
-                return 'module_name'
-            elif column == 'SET':
-                return 'set_val'
-            elif column == 'CONNECTION':
-                return 'conn'
+            # Значения столбцов identity и вычисляемых столбцов формируются заново при вставке
+            self._execute("SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 AND "
+                          "NOT attisdropped AND attidentity = '' AND attgenerated = '' ORDER BY attnum",
+                          [target_table_name])
+            columns: list[str] = ['"{0}"'.format(row[0]) for row in self._cursor.fetchall()]
+            self._execute(f'DELETE FROM {target_table_name}')
+        elif self._base_type == BaseType.SQLITE:
+            self._execute(f'PRAGMA table_info("{target_table_name}")')
+            columns: list[str] = ['"{0}"'.format(row[1]) for row in self._cursor.fetchall()]
+            self._execute(f'DELETE FROM {target_table_name}')
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        self._execute('INSERT INTO {0} ({1}) SELECT {1} FROM {2}'.format(target_table_name, ', '.join(columns),
+                                                                       staged_table_name))
+        self._execute(f'DROP TABLE {staged_table_name}')
+
+    def _discard_staged_tables(self, table_names: list[str]) -> None:
+        self._connection.rollback()
+        self._reset_transaction_state()
+        for table_name in table_names:
+            if table_name not in self._staged_tables:
+                continue
+            self._invalidate_result_cache(table_name)
+            staged_table_name: str = self._staged_tables.pop(table_name)[0]
+            try:
+                self._execute(f'DROP TABLE {staged_table_name}')
+                self._commit()
+            except (pyodbc.Error, psycopg.Error, sqlite3.Error):
+                logging.exception(f'Не удалось удалить промежуточную таблицу {staged_table_name}')
+                self._connection.rollback()
+        self._query_cache.clear()
+
+    def ensure_indexes(self, indexes: list[IndexDescription]) -> list[str]:
+        """
+        Создание отсутствующих индексов. Для каждого созданного индекса в лог записывается время выполнения
+        пробных запросов (по значениям из первых строк таблицы) до и после создания индекса
+        :param indexes: Индексы, необходимые этапу
+        :return: Имена созданных индексов
+        """
+        created_indexes: list[str] = []
+        if self._read_only:
+            # Индексы snapshot создаются при выгрузке (export_snapshot)
+            return created_indexes
+        for index in indexes:
+            table_name: str = self.modify_table_name(index.table_name)
+            columns: list[str] = self.modify_column_names(index.columns)
+            index_type: IndexType = index.index_type if self._base_type == BaseType.POSTGRES else IndexType.BTREE
+            index_name: str = 'ix_{0}_{1}{2}'.format(table_name.strip('[]"').replace(' ', '_'), '_'.join(columns),
+                                                    {IndexType.BTREE: '',
+                                                     IndexType.PATTERN: '_pattern',
+                                                     IndexType.TRIGRAM: '_trgm'}[index_type])[:63].lower()
+            if self._has_index(table_name=table_name, columns=columns, index_type=index_type, index_name=index_name):
+                continue
+            sample_queries: list[dict] = self._get_index_sample_queries(index=index, columns=columns)
+            time_before: float = self._measure_queries(sample_queries)
+            if not self._create_index(table_name=table_name, columns=columns, index_type=index_type,
+                                      index_name=index_name):
+                continue
+            time_after: float = self._measure_queries(sample_queries)
+            created_indexes.append(index_name)
+            if len(sample_queries) == 0 or time_after == 0:
+                logging.info(f'Создан индекс {index_name}')
             else:
-                return column.lower()
+                logging.info('Создан индекс {0} ({1} пробных запросов: {2:.4f} с -> {3:.4f} с, ускорение {4:.1f}x)'
+                             .format(index_name, len(sample_queries), time_before, time_after,
+                                     time_before / time_after))
+        return created_indexes
+
+    def _has_index(self, table_name: str, columns: list[str], index_type: IndexType, index_name: str) -> bool:
+        if self._base_type == BaseType.ACCESS:
+            index_columns: dict[str, list[str]] = {}
+            for row in self._cursor.statistics(table=table_name.strip('[]')):
+                if row.index_name is not None:
+                    index_columns.setdefault(row.index_name, []).append(row.column_name.lower())
+            return index_name in index_columns or [column.lower() for column in columns] in index_columns.values()
+        elif self._base_type == BaseType.POSTGRES:
+            self._execute('SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s', [table_name])
+            method: str = 'gin' if index_type == IndexType.TRIGRAM else 'btree'
+            operator_class: str = {IndexType.BTREE: '',
+                                   IndexType.PATTERN: ' text_pattern_ops',
+                                   IndexType.TRIGRAM: ' gin_trgm_ops'}[index_type]
+            definition: str = 'USING {0} ({1})'.format(method, ', '.join([column + operator_class
+                                                                         for column in columns]))
+            return any(name == index_name or definition in index_definition
+                       for name, index_definition in self._cursor.fetchall())
+        elif self._base_type == BaseType.SQLITE:
+            self._execute(f'PRAGMA index_list("{table_name}")')
+            for index_row in self._cursor.fetchall():
+                self._execute(f'PRAGMA index_info("{index_row[1]}")')
+                if index_row[1] == index_name or [row[2] for row in self._cursor.fetchall()] == columns:
+                    return True
+            return False
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
 
-    def get_base_type(self):
-        return self._base_type
+    def _create_index(self, table_name: str, columns: list[str], index_type: IndexType, index_name: str) -> bool:
+        if self._base_type == BaseType.ACCESS:
+            self._execute('CREATE INDEX {0} ON {1} ({2})'.format(
+                index_name, table_name, ', '.join(['[{0}]'.format(column) for column in columns])))
+        elif self._base_type == BaseType.POSTGRES:
+            if index_type == IndexType.TRIGRAM:
+                try:
+                    self._execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                except psycopg.Error:
+                    self._connection.rollback()
+                    logging.warning(f'Расширение pg_trgm недоступно, индекс {index_name} не создан')
+                    return False
+                self._execute('CREATE INDEX {0} ON {1} USING gin ({2})'.format(
+                    index_name, table_name, ', '.join([column + ' gin_trgm_ops' for column in columns])))
+            else:
+                operator_class: str = ' text_pattern_ops' if index_type == IndexType.PATTERN else ''
+                self._execute('CREATE INDEX {0} ON {1} ({2})'.format(
+                    index_name, table_name, ', '.join([column + operator_class for column in columns])))
+            self._execute(f'ANALYZE {table_name}')
+        elif self._base_type == BaseType.SQLITE:
+            self._execute('CREATE INDEX {0} ON {1} ({2})'.format(index_name, table_name, ', '.join(columns)))
+            self._execute(f'ANALYZE {table_name}')
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        self._commit()
+        return True
 
-    def modify_table_name(self, table_name: str) -> str:
+    def _get_index_sample_queries(self, index: IndexDescription, columns: list[str]) -> list[dict]:
+        """
+        Пробные запросы для оценки индекса: поиск по значениям индексируемых столбцов из первых строк таблицы
+        """
+        self._execute('SELECT {0}{1} FROM {2}{3}'.format(
+            'TOP {0} '.format(self.INDEX_SAMPLE_SIZE) if self._base_type == BaseType.ACCESS else '',
+            ', '.join(columns), self.modify_table_name(index.table_name),
+            '' if self._base_type == BaseType.ACCESS else ' LIMIT {0}'.format(self.INDEX_SAMPLE_SIZE)))
+        key_operator: list[str] = ['=' if index.index_type == IndexType.BTREE else 'LIKE'] * len(columns)
+        return [{'table_name': index.table_name,
+                 'fields': index.columns,
+                 'key_names': index.columns,
+                 'key_values': list(row),
+                 'key_operator': key_operator} for row in self._cursor.fetchall()]
+
+    def _measure_queries(self, queries: list[dict]) -> float:
+        start_time: float = time.perf_counter()
+        for query in queries:
+            self.retrieve_data(**query)
+        return time.perf_counter() - start_time
+
+    def get_table_names(self) -> list[str]:
+        """
+        Список таблиц базы (имена в том виде, в котором они хранятся в базе)
+        :return: Имена таблиц
+        """
         if self._base_type == BaseType.ACCESS:
-            return f'[{table_name}]'
+            return [row.table_name for row in self._cursor.tables(tableType='TABLE')]
         elif self._base_type == BaseType.POSTGRES:
-            match table_name:
-                case 'Логика ТС ОДУ':
-                    return 'ts_odu_logic'
-                case 'Модули связи с процессом':
-                    return 'process_modules'
-                case 'МЭК 61850':
-                    return 'iec_61850'
-                case 'Периферийное оборудование':
-                    return 'extern_devices'
-                case 'Сигналы и механизмы':
-                    return 'signals_and_mechanisms'
-                case 'Сигналы и механизмы АЭП':
-                    return 'signals_and_mechanisms_aep'
-                case 'Сигналы и механизмы ТС ОДУ':
-                    return 'ts_odu_signals_and_mechanisms'
-                case 'REF':
-                    return 'refs'
-                case _:
-                    return f'{table_name.lower().replace(" ", "_")}'
+            self._execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public' AND "
+                          "table_type = 'BASE TABLE' ORDER BY table_name")
+            return [row[0] for row in self._cursor.fetchall()]
+        elif self._base_type == BaseType.SQLITE:
+            self._execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+                          "ORDER BY name")
+            return [row[0] for row in self._cursor.fetchall()]
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+
+    def create_table(self, table_name: str, column_names: list[str]) -> bool:
+        """
+        Создание таблицы с текстовыми столбцами, если ее нет в базе
+        :param table_name: Имя таблицы
+        :param column_names: Имена столбцов
+        :return: True, если таблица создана
+        """
+        self._check_writable()
+        target_table_name: str = self.modify_table_name(table_name)
+        if target_table_name.strip('[]') in self.get_table_names():
+            return False
+        if self._base_type == BaseType.ACCESS:
+            column_type: str = 'TEXT(255)'
+        elif self._base_type in (BaseType.POSTGRES, BaseType.SQLITE):
+            column_type: str = 'TEXT'
         else:
             raise Exception("Неподдерживаемый тип DBEngine")
+        self._execute('CREATE TABLE {0} ({1})'.format(
+            target_table_name, ', '.join(['{0} {1}'.format(column, column_type)
+                                          for column in self.modify_column_names(column_names)])))
+        self._commit()
+        logging.info(f'Создана таблица {table_name}')
+        return True
+
+    def _get_column_types(self, table_name: str) -> list[tuple[str, str]]:
+        """
+        Столбцы таблицы и соответствующие им типы SQLite
+        :param table_name: Имя таблицы в том виде, в котором оно хранится в базе
+        :return: Список пар (имя столбца, тип SQLite)
+        """
+        columns: list[tuple[str, str]]
+        if self._base_type == BaseType.ACCESS:
+            columns = [(row.column_name, row.type_name) for row in self._cursor.columns(table=table_name)]
+        elif self._base_type == BaseType.POSTGRES:
+            self._execute("SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = "
+                          "'public' AND table_name = %s ORDER BY ordinal_position", [table_name])
+            columns = [(row[0], row[1]) for row in self._cursor.fetchall()]
+        elif self._base_type == BaseType.SQLITE:
+            self._execute(f'PRAGMA table_info("{table_name}")')
+            columns = [(row[1], row[2]) for row in self._cursor.fetchall()]
+        else:
+            raise Exception("Неподдерживаемый тип DBEngine")
+        return [(column_name, self._get_sqlite_type(type_name)) for column_name, type_name in columns]
+
+    @staticmethod
+    def _get_sqlite_type(type_name: str) -> str:
+        type_name = type_name.upper()
+        if type_name in ('BIT', 'BOOLEAN', 'BOOL'):
+            return 'BOOLEAN'
+        if type_name in ('COUNTER', 'INTEGER', 'SMALLINT', 'BIGINT', 'BYTE', 'LONG', 'INT'):
+            return 'INTEGER'
+        if type_name in ('DOUBLE', 'REAL', 'DOUBLE PRECISION', 'FLOAT', 'SINGLE'):
+            return 'REAL'
+        # Остальные типы (в т.ч. NUMERIC, даты) хранятся как текст, чтобы строковое представление совпадало
+        # с исходной базой
+        return 'TEXT'
+
+    def clone_to_sqlite(self, base_path: str, table_names: list[str] | None = None) -> 'Connection':
+        """
+        Копирование таблиц открытой базы (Postgres или Access) в файл SQLite. Имена таблиц и столбцов
+        преобразуются по тем же правилам, что и для Postgres (modify_table_name, modify_column_name)
+        :param base_path: Путь к файлу SQLite. Существующие таблицы с теми же именами пересоздаются
+        :param table_names: Имена копируемых таблиц (по умолчанию - все таблицы базы)
+        :return: Соединение с созданной базой SQLite (не открытое)
+        """
+        if table_names is None:
+            table_names = self.get_table_names()
+        target: Connection = Connection.connect_to_sqlite(base_path)
+        with target:
+            for table_name in table_names:
+                source_table_name: str = self.modify_table_name(table_name)
+                target_table_name: str = target.modify_table_name(table_name)
+                column_types: list[tuple[str, str]] = self._get_column_types(source_table_name.strip('[]'))
+                target_columns: list[str] = target.modify_column_names([column for column, _ in column_types])
+                target._execute(f'DROP TABLE IF EXISTS "{target_table_name}"')
+                target._execute('CREATE TABLE "{0}" ({1})'.format(
+                    target_table_name, ', '.join(['"{0}" {1}'.format(column, column_type)
+                                                  for column, (_, column_type) in zip(target_columns, column_types)])))
+                if self._base_type == BaseType.ACCESS:
+                    select_columns: list[str] = ['[{0}]'.format(column) for column, _ in column_types]
+                else:
+                    select_columns: list[str] = ['"{0}"'.format(column) for column, _ in column_types]
+                query: str = 'SELECT {0} FROM {1}'.format(', '.join(select_columns), source_table_name)
+                # Значения копируются без преобразования в строку, чтобы сохранить типы
+                row_count: int = target._write_rows(
+                    table_name='"{0}"'.format(target_table_name),
+                    column_names=['"{0}"'.format(column) for column in target_columns],
+                    rows=([self._get_sqlite_value(value) for value in row]
+                          for rows in self._iter_row_batches(query=query, params=None, batch_size=self.COPY_BATCH_SIZE)
+                          for row in rows))
+                target.commit()
+                logging.info(f'Таблица {table_name} скопирована в SQLite: {row_count} строк')
+        return target
+
+    def export_snapshot(self, snapshot_path: str, table_names: list[str],
+                        indexes: list[IndexDescription] | None = None) -> 'Connection':
+        """
+        Выгрузка таблиц в файл snapshot для работы скриптов без сервера. Snapshot - база SQLite (см. clone_to_sqlite),
+        уплотненная через VACUUM, с индексами для поиска. Существующий файл перезаписывается. Snapshot открывается
+        только для чтения (open_snapshot), для скриптов, изменяющих таблицы, используется рабочая копия
+        (copy_snapshot)
+        :param snapshot_path: Путь к файлу snapshot
+        :param table_names: Имена выгружаемых таблиц
+        :param indexes: Индексы, создаваемые в snapshot
+        :return: Соединение с snapshot только для чтения (не открытое)
+        """
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        snapshot: Connection = self.clone_to_sqlite(base_path=snapshot_path, table_names=table_names)
+        with snapshot:
+            if indexes is not None:
+                snapshot.ensure_indexes(indexes)
+            snapshot._execute('VACUUM')
+        logging.info(f'Snapshot сохранен в {snapshot_path}: {os.path.getsize(snapshot_path)} байт')
+        return Connection.open_snapshot(snapshot_path)
+
+    def _check_writable(self) -> None:
+        if self._read_only:
+            print("Соединение открыто только для чтения")
+            raise Exception("AccessError")
+
+    @staticmethod
+    def _get_sqlite_value(value):
+        if value is None or isinstance(value, (int, float, str, bytes)):
+            return value
+        return str(value)
 
     @staticmethod
     def get_string_value(value: str | float | int | None) -> str:
@@ -406,3 +1948,269 @@ class Connection:
         connection: Connection = Connection(connection_string)
         connection._base_type = BaseType.POSTGRES
         return connection
+
+    @staticmethod
+    def connect_to_sqlite(base_path: str):
+        connection: Connection = Connection(base_path)
+        connection._base_type = BaseType.SQLITE
+        return connection
+
+    @staticmethod
+    def open_snapshot(snapshot_path: str):
+        """
+        Соединение с файлом snapshot (см. export_snapshot) только для чтения. Файл отображается в память,
+        запись в таблицы вызывает исключение. Подходит только для чтения таблиц (retrieve_data, count_values и пр.),
+        скрипты заполнения таблиц (GenerateTables, FillMMSAdress, FillRef2) запускаются на копии (copy_snapshot)
+        :param snapshot_path: Путь к файлу snapshot
+        :return: Соединение (не открытое)
+        """
+        connection: Connection = Connection.connect_to_sqlite(snapshot_path)
+        connection._read_only = True
+        return connection
+
+    @staticmethod
+    def copy_snapshot(snapshot_path: str, working_path: str):
+        """
+        Рабочая копия snapshot для скриптов, изменяющих таблицы. Файл snapshot копируется в working_path
+        (существующий файл перезаписывается) и не изменяется, поэтому каждый повторный запуск начинается с одного
+        и того же состояния базы
+        :param snapshot_path: Путь к файлу snapshot
+        :param working_path: Путь к рабочей копии
+        :return: Соединение с рабочей копией (не открытое)
+        """
+        shutil.copyfile(snapshot_path, working_path)
+        return Connection.connect_to_sqlite(working_path)
+
+
+class ConnectionPool:
+    """
+    Пул соединений для параллельных этапов. Каждый поток получает собственное соединение со своим курсором,
+    число одновременно открытых соединений ограничено max_size. Перед повторной выдачей соединение проверяется
+    (Connection.is_alive), неработоспособные соединения закрываются и открываются заново.
+    Фиксация транзакций остается за вызывающим кодом: при возврате соединения в пул выполняется только фиксация,
+    отложенная политикой транзакций (как при закрытии Connection), остальные незафиксированные изменения
+    отменяются, поэтому следующий поток получает соединение без открытой транзакции
+    """
+    _connection_string: str
+    _base_type: BaseType
+    _max_size: int
+    _idle_connections: list[Connection]
+    _lock: threading.Lock
+    _semaphore: threading.BoundedSemaphore
+    _local: threading.local
+
+    def __init__(self, connection_string: str, base_type: BaseType, max_size: int = 4):
+        if max_size < 1:
+            raise Exception("Размер пула соединений должен быть больше нуля")
+        self._connection_string = connection_string
+        self._base_type = base_type
+        self._max_size = max_size
+        self._idle_connections = []
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """
+        Получение соединения для текущего потока. Повторный (вложенный) вызов в том же потоке возвращает
+        то же соединение
+        :return: Открытое соединение
+        """
+        connection: Connection | None = getattr(self._local, 'connection', None)
+        if connection is not None:
+            yield connection
+            return
+        self._semaphore.acquire()
+        try:
+            connection = self._take_connection()
+            self._local.connection = connection
+            try:
+                yield connection
+            except BaseException:
+                # Состояние соединения после ошибки неизвестно (например, прерванная транзакция Postgres)
+                self._local.connection = None
+                self._close_connection(connection)
+                raise
+            self._local.connection = None
+            try:
+                self._finish_transaction(connection)
+            except BaseException:
+                self._close_connection(connection)
+                raise
+            with self._lock:
+                self._idle_connections.append(connection)
+        finally:
+            self._semaphore.release()
+
+    @staticmethod
+    def _finish_transaction(connection: Connection) -> None:
+        if connection._pending_commit:
+            connection._commit()
+        # Для Postgres также завершается транзакция, открытая запросами чтения (idle in transaction)
+        connection.rollback()
+
+    def _take_connection(self) -> Connection:
+        while True:
+            with self._lock:
+                if len(self._idle_connections) == 0:
+                    break
+                connection: Connection = self._idle_connections.pop()
+            if connection.is_alive():
+                return connection
+            logging.debug('Соединение из пула неработоспособно и будет открыто заново')
+            self._close_connection(connection)
+        connection: Connection = Connection(self._connection_string)
+        connection._base_type = self._base_type
+        return connection.__enter__()
+
+    @staticmethod
+    def _close_connection(connection: Connection) -> None:
+        # Незафиксированные изменения (в т.ч. отложенные политикой транзакций) отменяются, а не фиксируются
+        try:
+            connection.rollback()
+        except (pyodbc.Error, psycopg.Error, sqlite3.Error):
+            pass
+        try:
+            connection.__exit__(None, None, None)
+        except (pyodbc.Error, psycopg.Error, sqlite3.Error):
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            connections: list[Connection] = self._idle_connections
+            self._idle_connections = []
+        for connection in connections:
+            self._close_connection(connection)
+
+
+class AsyncConnection:
+    """
+    Асинхронное соединение с Postgres на основе psycopg.AsyncConnection. Открывается через async with.
+    Запросы, запущенные одновременно (например, через asyncio.gather), выполняются параллельно на
+    max_connections соединениях с сервером. Формирование текстов запросов и преобразование имен таблиц и
+    столбцов выполняются так же, как в Connection, но кэш запросов у асинхронного соединения свой.
+    Каждое соединение работает в своей транзакции, commit() фиксирует изменения на всех соединениях
+    """
+    _connection_string: str
+    _base_type: BaseType
+    _max_connections: int
+    _query_builder: Connection
+    _connections: list[psycopg.AsyncConnection]
+    _free_connections: asyncio.Queue
+
+    def __init__(self, connection_string: str, base_type: BaseType, max_connections: int = 4):
+        if base_type != BaseType.POSTGRES:
+            raise Exception("Асинхронный режим поддерживается только для Postgres")
+        if max_connections < 1:
+            raise Exception("Число соединений должно быть больше нуля")
+        self._connection_string = connection_string
+        self._base_type = base_type
+        self._max_connections = max_connections
+        # Соединение не открывается и используется только для построения запросов
+        self._query_builder = Connection(connection_string)
+        self._query_builder._base_type = base_type
+        self._connections = []
+
+    async def __aenter__(self):
+        self._connections = list(await asyncio.gather(
+            *[psycopg.AsyncConnection.connect(self._connection_string) for _ in range(self._max_connections)]))
+        self._free_connections = asyncio.Queue()
+        for connection in self._connections:
+            self._free_connections.put_nowait(connection)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        logging.debug('Кэш запросов: попаданий {0}, промахов {1}'.format(
+            *self._query_builder.get_query_cache_statistics()))
+        for connection in self._connections:
+            await connection.close()
+        self._connections = []
+
+    @asynccontextmanager
+    async def _acquire(self):
+        connection: psycopg.AsyncConnection = await self._free_connections.get()
+        try:
+            yield connection
+        finally:
+            self._free_connections.put_nowait(connection)
+
+    async def retrieve_data(self, table_name: str, fields: list[str],
+                            key_names: list[str] | None = None,
+                            key_values: list[str | int | bool | None] | None = None,
+                            uniq_values: bool = False,
+                            sort_by: list[str] | None = None,
+                            key_operator: list[str] | None = None) -> list[dict[str, str]]:
+        query, key_values_for_query, fields = self._query_builder._build_select_query(table_name=table_name,
+                                                                                      fields=fields,
+                                                                                      key_names=key_names,
+                                                                                      key_values=key_values,
+                                                                                      uniq_values=uniq_values,
+                                                                                      sort_by=sort_by,
+                                                                                      key_operator=key_operator)
+        async with self._acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(query, key_values_for_query, prepare=key_values_for_query is not None)
+                rows = await cursor.fetchall()
+        return Connection._convert_rows(rows=rows, fields=fields)
+
+    async def update_field(self, table_name: str, fields: list[str], values: list[str], key_names: list[str],
+                           key_values: list[str]) -> None:
+        if len(key_values) != len(key_names):
+            print("Несоответствие названий ключевых полей и их значений")
+            raise Exception("AccessError")
+        if len(fields) != len(values):
+            print("Несоответствие названий обновляемых полей и их значений")
+            raise Exception("AccessError")
+        query: str = self._query_builder._build_update_query(table_name=table_name, fields=fields,
+                                                             key_names=key_names)
+        async with self._acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(query, list(values) + list(key_values), prepare=True)
+
+    async def insert_rows(self, table_name: str, column_names: list[str],
+                          rows: Iterable[list[str | int | float | bool | None] | tuple]) -> int:
+        """
+        Пакетная запись строк в таблицу через COPY
+        :param table_name: Имя таблицы
+        :param column_names: Имена столбцов
+        :param rows: Строки со значениями в порядке column_names
+        :return: Число записанных строк
+        """
+        table_name = self.modify_table_name(table_name)
+        column_names = self.modify_column_names(column_names)
+        query: str = 'COPY {0} ({1}) FROM STDIN'.format(table_name, ','.join(column_names))
+        row_count: int = 0
+        async with self._acquire() as connection:
+            async with connection.cursor() as cursor:
+                for batch in Connection._split_to_batches(rows, Connection.COPY_BATCH_SIZE):
+                    Connection._check_row_lengths(batch, len(column_names))
+                    async with cursor.copy(query) as copy:
+                        for row in batch:
+                            await copy.write_row(row)
+                    row_count += len(batch)
+        return row_count
+
+    async def commit(self) -> None:
+        await asyncio.gather(*[connection.commit() for connection in self._connections])
+
+    def get_schema_registry(self) -> SchemaRegistry:
+        return self._query_builder.get_schema_registry()
+
+    def modify_column_names(self, columns: list[str]) -> list[str] | None:
+        return self._query_builder.modify_column_names(columns)
+
+    def modify_column_name(self, column: str) -> str | None:
+        return self._query_builder.modify_column_name(column)
+
+    def modify_table_name(self, table_name: str) -> str:
+        return self._query_builder.modify_table_name(table_name)
+
+    def get_base_type(self):
+        return self._base_type